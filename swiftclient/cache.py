@@ -0,0 +1,244 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+On-disk cache of container listings.
+
+A listing is saved along with the container's object count, bytes used and
+timestamps, and only used again while a HEAD of the container returns the
+same ones, so checking a cached listing costs a single request. Overwriting
+an object with one of the same size changes none of them, so such changes
+made by other clients are not noticed until something else changes;
+:class:`swiftclient.client.Connection` drops the listings of the containers
+it changes itself.
+"""
+
+import os
+
+from swiftclient.client import ClientException
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+try:
+    from simplejson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import dumps as json_dumps, loads as json_loads
+
+# headers of a container HEAD that a cached listing is checked against
+VALIDATOR_HEADERS = ('x-container-object-count', 'x-container-bytes-used',
+                     'x-timestamp', 'x-put-timestamp', 'last-modified')
+
+# number of objects of a listing being saved written per transaction
+STORE_BATCH_SIZE = 1000
+
+
+def default_cache_path():
+    """Return the path of the listing cache under the user's cache dir."""
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'swiftclient', 'listings.sqlite')
+
+
+def _validator(headers):
+    if 'x-container-object-count' not in headers:
+        return None
+    return '\n'.join(headers.get(header, '') for header in VALIDATOR_HEADERS)
+
+
+def _unicode(value):
+    if isinstance(value, str):
+        return value.decode('utf8')
+    return value
+
+
+class ListingCache(object):
+    """
+    SQLite store of complete container listings, keyed by storage URL and
+    container name.
+
+    Each call opens a database connection of its own, so one ListingCache
+    can be shared by threads and by processes.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: database file; by default see :func:`default_cache_path`
+        """
+        if sqlite3 is None:
+            raise ClientException('ListingCache requires sqlite3')
+        self.path = path or default_cache_path()
+        self._invalidated = set()
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        db = self._connect()
+        try:
+            with db:
+                db.execute('CREATE TABLE IF NOT EXISTS containers ('
+                           'id INTEGER PRIMARY KEY, url TEXT, name TEXT, '
+                           'validator TEXT, UNIQUE (url, name))')
+                db.execute('CREATE TABLE IF NOT EXISTS objects ('
+                           'container_id INTEGER, name TEXT, item TEXT, '
+                           'PRIMARY KEY (container_id, name))')
+        finally:
+            db.close()
+
+    def _connect(self):
+        # a listing being saved or read may be resumed from another thread
+        return sqlite3.connect(self.path, timeout=60,
+                               check_same_thread=False)
+
+    def get(self, url, container, headers, marker=None, prefix=None,
+            end_marker=None):
+        """
+        Return the cached listing of a container if it is still valid.
+
+        :param url: storage URL
+        :param container: container name
+        :param headers: headers of a HEAD of the container just made
+        :param marker: only list objects after this name
+        :param prefix: only list objects whose names start with this
+        :param end_marker: only list objects before this name
+        :returns: generator of the object dicts, in listing order, or None
+                  if nothing valid is cached
+        """
+        validator = _validator(headers)
+        if validator is None:
+            return None
+        db = self._connect()
+        row = db.execute('SELECT id, validator FROM containers '
+                         'WHERE url = ? AND name = ?',
+                         (_unicode(url), _unicode(container))).fetchone()
+        if row is None or row[1] != validator:
+            db.close()
+            return None
+        return self._iter_rows(db, row[0], _unicode(marker),
+                               _unicode(prefix), _unicode(end_marker))
+
+    def _iter_rows(self, db, container_id, marker, prefix, end_marker):
+        # The names of the (container_id, name) index are in the same
+        # (binary UTF-8) order as the listing, so the rows are read in order
+        # from the first one past the marker and prefix.
+        query = 'SELECT name, item FROM objects WHERE container_id = ?'
+        args = [container_id]
+        if marker:
+            query += ' AND name > ?'
+            args.append(marker)
+        if prefix:
+            query += ' AND name >= ?'
+            args.append(prefix)
+        if end_marker:
+            query += ' AND name < ?'
+            args.append(end_marker)
+        try:
+            for name, item in db.execute(query + ' ORDER BY name', args):
+                if prefix and not name.startswith(prefix):
+                    return
+                yield json_loads(item)
+        finally:
+            db.close()
+
+    def store(self, url, container, headers, listing):
+        """
+        Save the complete listing of a container as it is consumed.
+
+        :param url: storage URL
+        :param container: container name
+        :param headers: headers of a HEAD of the container made before the
+                        listing was started
+        :param listing: iterable of all the container's object dicts
+        :returns: generator of the object dicts of listing; they are saved
+                  once it has been run to the end, and not at all if it is
+                  closed early or the listing fails
+        """
+        validator = _validator(headers)
+        if validator is None:
+            for item in listing:
+                yield item
+            return
+        url, container = _unicode(url), _unicode(container)
+        db = self._connect()
+        try:
+            # The rows are written under a staging container row of their
+            # own, a batch per transaction, so the database is not locked
+            # while the listing is consumed; only the final swap replaces
+            # the saved listing.
+            with db:
+                staging_id = db.execute(
+                    'INSERT INTO containers (url, name) VALUES (NULL, NULL)'
+                ).lastrowid
+            swapped = False
+            try:
+                rows = []
+                for item in listing:
+                    rows.append((staging_id, item['name'], json_dumps(item)))
+                    yield item
+                    if len(rows) >= STORE_BATCH_SIZE:
+                        self._insert_rows(db, rows)
+                        rows = []
+                self._insert_rows(db, rows)
+                with db:
+                    row = db.execute('SELECT id FROM containers '
+                                     'WHERE url = ? AND name = ?',
+                                     (url, container)).fetchone()
+                    if row is not None:
+                        db.execute('DELETE FROM containers WHERE id = ?', row)
+                    db.execute('UPDATE containers SET url = ?, name = ?, '
+                               'validator = ? WHERE id = ?',
+                               (url, container, validator, staging_id))
+                swapped = True
+                self._invalidated.discard((url, container))
+                if row is not None:
+                    with db:
+                        db.execute('DELETE FROM objects WHERE '
+                                   'container_id = ?', row)
+            finally:
+                if not swapped:
+                    with db:
+                        db.execute('DELETE FROM objects WHERE '
+                                   'container_id = ?', (staging_id,))
+                        db.execute('DELETE FROM containers WHERE id = ?',
+                                   (staging_id,))
+        finally:
+            db.close()
+
+    def _insert_rows(self, db, rows):
+        if rows:
+            with db:
+                db.executemany('INSERT OR REPLACE INTO objects '
+                               '(container_id, name, item) VALUES (?, ?, ?)',
+                               rows)
+
+    def invalidate(self, url, container):
+        """
+        Stop using the cached listing of a container.
+
+        Only the first call for a container has to update the database, so
+        it is cheap to call after every change made to the container.
+        """
+        key = (_unicode(url), _unicode(container))
+        if key in self._invalidated:
+            return
+        db = self._connect()
+        try:
+            with db:
+                db.execute('UPDATE containers SET validator = NULL '
+                           'WHERE url = ? AND name = ?', key)
+        finally:
+            db.close()
+        self._invalidated.add(key)
@@ -17,16 +17,27 @@
 Cloud Files client library used internally
 """
 
+import copy
+import errno
+import os
+import select
 import socket
+import ssl
+import stat
 import sys
 import logging
 import warnings
 from functools import wraps
+from hashlib import md5
+from itertools import islice
+from threading import Condition, Lock, Thread
+from Queue import Empty, Queue
 
-from urllib import quote as _quote
+from urllib import quote as _quote, unquote
 from urlparse import urlparse, urlunparse
-from httplib import HTTPException, HTTPConnection, HTTPSConnection
-from time import sleep
+from httplib import HTTPException, HTTPConnection, HTTPSConnection, \
+    IncompleteRead
+from time import sleep, time
 
 
 logger = logging.getLogger("swiftclient")
@@ -86,6 +97,22 @@ except ImportError:
     # 2.6 will have a json module in the stdlib
     from json import loads as json_loads
 
+# zero-copy uploads need sendfile(2); Python 2 only has it via pysendfile
+try:
+    from os import sendfile
+except ImportError:
+    try:
+        from sendfile import sendfile
+    except ImportError:
+        sendfile = None
+
+# Python 2.6 has no memoryview, so reads and uploads can't fill a slice of a
+# reused buffer in place and copy strings instead
+try:
+    memoryview
+except NameError:
+    memoryview = None
+
 
 class ClientException(Exception):
 
@@ -141,27 +168,250 @@ class ClientException(Exception):
         return b and '%s: %s' % (a, b) or a
 
 
-def http_connection(url, proxy=None):
+class ThroughputMonitor(object):
+    """
+    Abort transfers that are going slower than a minimum rate.
+
+    The rate is measured over consecutive windows so a transfer that starts
+    fast and then crawls is caught as well. A transfer that stops entirely is
+    left to the read timeout.
+    """
+
+    def __init__(self, min_throughput, window=10):
+        """
+        :param min_throughput: minimum acceptable rate in bytes per second
+        :param window: length in seconds of each measurement window
+        """
+        self.min_throughput = min_throughput
+        self.window = window
+        self.window_start = time()
+        self.window_bytes = 0
+
+    def update(self, nbytes):
+        """
+        Account for nbytes more having been transferred.
+
+        :raises socket.timeout: the last window was below the minimum rate
+        """
+        self.window_bytes += nbytes
+        now = time()
+        elapsed = now - self.window_start
+        if elapsed < self.window:
+            return
+        if self.window_bytes < self.min_throughput * elapsed:
+            raise socket.timeout(
+                'Transfer rate %.0f B/s below minimum of %s B/s' %
+                (self.window_bytes / elapsed, self.min_throughput))
+        self.window_start = now
+        self.window_bytes = 0
+
+
+class AdaptiveChunkSizer(object):
+    """
+    Pick transfer chunk sizes from the throughput measured on a connection.
+
+    Chunks are sized to take about target_interval seconds each, so fast links
+    are not held back by per-chunk overhead (one send or receive call per
+    chunk) while slow ones still get small chunks that can be aborted
+    promptly. The size is doubled or halved as the throughput changes,
+    staying between min_size and max_size.
+
+    A sizer measures one connection, so it is not to be shared between
+    transfers running at the same time.
+    """
+
+    def __init__(self, min_size=16384, max_size=4194304, initial_size=65536,
+                 target_interval=0.05):
+        """
+        :param min_size: smallest chunk size to use
+        :param max_size: largest chunk size to use
+        :param initial_size: chunk size to start with
+        :param target_interval: time in seconds each chunk should take
+        """
+        if min_size > max_size:
+            raise ValueError('min_size %s is bigger than max_size %s' %
+                             (min_size, max_size))
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = max(min_size, min(max_size, initial_size))
+        self.target_interval = target_interval
+        self.throughput = None
+        self.chunk_rate = None
+        self.chunks = 0
+        self.bytes = 0
+        self.sizes = {}
+        self.last = time()
+
+    def start(self):
+        """Start timing a new transfer."""
+        self.last = time()
+
+    def update(self, nbytes):
+        """
+        Account for a chunk of nbytes having been transferred since the
+        previous one (or since :meth:`start`), and adjust the chunk size.
+        """
+        now = time()
+        elapsed = max(now - self.last, 1e-6)
+        self.last = now
+        self.chunks += 1
+        self.bytes += nbytes
+        self.sizes[self.size] = self.sizes.get(self.size, 0) + 1
+        if self.throughput is None:
+            self.throughput = nbytes / elapsed
+            self.chunk_rate = 1 / elapsed
+        else:
+            self.throughput = 0.8 * self.throughput + 0.2 * nbytes / elapsed
+            self.chunk_rate = 0.8 * self.chunk_rate + 0.2 / elapsed
+        wanted = self.throughput * self.target_interval
+        if wanted >= self.size * 2 and self.size * 2 <= self.max_size:
+            self.size *= 2
+        elif wanted < self.size / 2 and self.size / 2 >= self.min_size:
+            self.size /= 2
+
+    def stats(self):
+        """
+        :returns: a dict with the bounds, the current chunk size, the smoothed
+                  throughput (bytes per second) and chunk rate (chunks per
+                  second), totals, and how many chunks were sent of each size
+        """
+        return {'min_size': self.min_size, 'max_size': self.max_size,
+                'size': self.size, 'throughput': self.throughput,
+                'chunk_rate': self.chunk_rate, 'chunks': self.chunks,
+                'bytes': self.bytes, 'sizes': dict(self.sizes)}
+
+
+class RateLimiter(object):
+    """
+    Cap the combined rate of the transfers sharing it, with a token bucket.
+
+    Each transfer takes tokens for the bytes it moves. The bucket may go into
+    debt, which the taker then sleeps off outside the lock, so the lock is
+    only held for a little arithmetic however many threads share it.
+    """
+
+    def __init__(self, rate, burst=None, quantum=None):
+        """
+        :param rate: most bytes per second to let through
+        :param burst: most bytes to let through at once after being idle;
+                      defaults to one second's worth
+        :param quantum: if set, bytes are taken this many at a time, waiting
+                        for each, so that transfers sharing the limiter take
+                        turns in even slices rather than in whole chunks
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive, not %s' % rate)
+        self.rate = float(rate)
+        self.burst = burst or self.rate
+        self.quantum = quantum
+        self.tokens = self.burst
+        self.last = time()
+        self.lock = Lock()
+
+    def take(self, nbytes):
+        """
+        Take tokens for nbytes, sleeping until the rate allows them.
+        """
+        step = self.quantum or nbytes
+        while nbytes > 0:
+            size = min(step, nbytes)
+            nbytes -= size
+            with self.lock:
+                now = time()
+                self.tokens = min(
+                    self.burst,
+                    self.tokens + (now - self.last) * self.rate) - size
+                self.last = now
+                wait = -self.tokens / self.rate
+            if wait > 0:
+                sleep(wait)
+
+
+_ssl_contexts = {}
+_ssl_contexts_lock = Lock()
+
+
+def get_ssl_context(netloc, cacert=None, insecure=False):
+    """
+    Get the SSL context shared by every HTTPS connection to netloc.
+
+    Creating a context, and loading its CA certificates, for each connection
+    is a large part of what makes new HTTPS connections expensive; sharing
+    one per endpoint means it is only done once per process.
+
+    :param netloc: network location (host[:port]) of the endpoint
+    :param cacert: CA bundle file to verify the server certificate with
+    :param insecure: if True, do not verify the server certificate
+    :returns: an ssl.SSLContext, or None if this Python's ssl module has no
+              SSLContext (httplib then sets up each connection itself)
+    """
+    if not hasattr(ssl, 'SSLContext'):
+        return None
+    key = (netloc, cacert, insecure)
+    with _ssl_contexts_lock:
+        context = _ssl_contexts.get(key)
+        if context is None:
+            if insecure:
+                context = ssl._create_unverified_context()
+            elif cacert:
+                context = ssl.create_default_context(cafile=cacert)
+            else:
+                # what httplib would otherwise create for every connection
+                context = ssl._create_default_https_context()
+            _ssl_contexts[key] = context
+    return context
+
+
+def http_connection(url, proxy=None, connect_timeout=None,
+                    read_timeout=None, cacert=None, insecure=False):
     """
     Make an HTTPConnection or HTTPSConnection
 
     :param url: url to connect to
     :param proxy: proxy to connect through, if any; None by default; str of the
                   format 'http://127.0.0.1:8888' to set one
+    :param connect_timeout: timeout in seconds for establishing the
+                            connection; if None, the global default socket
+                            timeout is used
+    :param read_timeout: timeout in seconds for each send and receive once
+                         connected; if None, connect_timeout (or the global
+                         default) keeps applying
+    :param cacert: CA bundle file to verify HTTPS server certificates with
+    :param insecure: if True, do not verify HTTPS server certificates
     :returns: tuple of (parsed url, connection object)
     :raises ClientException: Unable to handle protocol scheme
     """
     url = encode_utf8(url)
     parsed = urlparse(url)
     proxy_parsed = urlparse(proxy) if proxy else None
+    conn_kwargs = {}
+    if connect_timeout is not None:
+        conn_kwargs['timeout'] = connect_timeout
     if parsed.scheme == 'http':
-        conn = HTTPConnection((proxy_parsed if proxy else parsed).netloc)
+        conn = HTTPConnection((proxy_parsed if proxy else parsed).netloc,
+                              **conn_kwargs)
     elif parsed.scheme == 'https':
-        conn = HTTPSConnection((proxy_parsed if proxy else parsed).netloc)
+        context = get_ssl_context(parsed.netloc, cacert=cacert,
+                                  insecure=insecure)
+        if context is not None:
+            conn_kwargs['context'] = context
+        conn = HTTPSConnection((proxy_parsed if proxy else parsed).netloc,
+                               **conn_kwargs)
     else:
         raise ClientException('Cannot handle protocol scheme %s for url %s' %
                               (parsed.scheme, repr(url)))
 
+    if read_timeout is not None:
+
+        def connect_wrapper(func):
+
+            @wraps(func)
+            def connect_read_timeout():
+                func()
+                conn.sock.settimeout(read_timeout)
+            return connect_read_timeout
+        conn.connect = connect_wrapper(conn.connect)
+
     def putheader_wrapper(func):
 
         @wraps(func)
@@ -185,6 +435,498 @@ def http_connection(url, proxy=None):
     return parsed, conn
 
 
+def _connection_is_stale(conn):
+    """
+    Check whether an idle keep-alive connection can be reused.
+
+    An idle connection should have nothing waiting to be read; if the socket
+    is readable the server has either closed it or sent something we did not
+    ask for, so it must not be handed out again.
+    """
+    sock = getattr(conn, 'sock', None)
+    if sock is None:
+        # not connected yet (or closed); httplib will (re)connect on demand
+        return False
+    try:
+        readable = select.select([sock], [], [], 0)[0]
+    except (select.error, socket.error, ValueError):
+        return True
+    return bool(readable)
+
+
+def _name_position(name, prefix):
+    """
+    Return roughly where name falls between the prefix alone (0.0) and the
+    last name starting with it (1.0, also returned for None), reading the
+    first characters after the prefix as the digits of a fraction.
+    """
+    if name is None:
+        return 1.0
+    position = 0.0
+    scale = 1.0
+    for char in name[len(prefix):len(prefix) + 8]:
+        scale /= 96
+        position += (min(max(ord(char), 31), 127) - 31) * scale
+    return position
+
+
+def _etag_record(path):
+    # file beside a partly downloaded object that holds the object's ETag
+    return path + '.swift-etag'
+
+
+def _recorded_etag(path):
+    # the ETag of the object a partial download in path came from, if known
+    try:
+        with open(_etag_record(path)) as fp:
+            return fp.read() or None
+    except IOError:
+        return None
+
+
+def _resume_offset(path, headers):
+    # how much of a partly downloaded object in path is worth keeping
+    size = os.path.getsize(path)
+    total = int(headers.get('content-length', -1))
+    etag = headers.get('etag', '').strip('"')
+    if size > total or not etag:
+        return 0
+    if _recorded_etag(path) == etag:
+        return size
+    if size == total:
+        # a copy of the right size but unknown origin is only kept if it
+        # matches: as a whole against the ETag, or a manifest's segment by
+        # segment against theirs
+        return size
+    return 0
+
+
+def _probe_markers(low, high, prefix, count):
+    """
+    Return up to count markers spread over the names after low and before
+    high (None for no limit), for probing a listing with.
+
+    They differ from low at the first character past the prefix where there
+    is a printable character between low's and high's; the first marker is
+    low's character plus one, so it finds the next name outside low's
+    subtree at that depth.
+    """
+    after = high is None
+    for i in xrange(len(prefix), len(low) + 1):
+        first = ord(low[i]) if i < len(low) else 31
+        if after or i >= len(high):
+            last = max(127, first + 1)
+        else:
+            last = ord(high[i])
+        if last - first > 1:
+            room = last - first - 1
+            chars = sorted(set(first + 1 + j * room // count
+                               for j in xrange(min(count, room))))
+            return [low[:i] + unichr(char) for char in chars]
+        if last > first:
+            after = True
+    return []
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections.
+
+    Connections are keyed by (scheme, host, port, proxy), so a single pool
+    can be shared by every :class:`Connection` in a process regardless of
+    which account they talk to.
+    """
+
+    def __init__(self, max_per_host=10, max_drain=65536):
+        """
+        :param max_per_host: maximum number of idle connections kept open per
+                             (scheme, host, port, proxy); connections released
+                             beyond this are closed
+        :param max_drain: maximum number of unread response bytes that will be
+                          read off a released connection so it can be reused;
+                          connections with more outstanding data are closed
+        """
+        self.max_per_host = max_per_host
+        self.max_drain = max_drain
+        self._idle = {}
+        self._lock = Lock()
+
+    def _key(self, url, proxy=None, **kwargs):
+        parsed = urlparse(encode_utf8(url))
+        return (parsed.scheme, parsed.hostname, parsed.port, proxy) + \
+            tuple(sorted(kwargs.items()))
+
+    def get(self, url, proxy=None, **kwargs):
+        """
+        Get a connection to url, reusing an idle one if possible.
+
+        :param url: url to connect to
+        :param proxy: proxy to connect through, if any
+        :param kwargs: extra arguments for :func:`http_connection`, such as
+                       timeouts; connections are only reused for requests
+                       made with the same arguments
+        :returns: tuple of (parsed url, connection object)
+        """
+        key = self._key(url, proxy, **kwargs)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                conn = idle.pop()
+            if _connection_is_stale(conn):
+                conn.close()
+                continue
+            return urlparse(encode_utf8(url)), conn
+        parsed, conn = http_connection(url, proxy=proxy, **kwargs)
+        conn._swift_pool_key = key
+        return parsed, conn
+
+    def put(self, http_conn):
+        """
+        Release a connection back to the pool.
+
+        Any partially read response is drained first; connections that cannot
+        be drained cheaply, or that exceed max_per_host, are closed.
+
+        :param http_conn: tuple of (parsed url, connection object) as returned
+                          by :meth:`get`
+        """
+        conn = http_conn[1]
+        key = getattr(conn, '_swift_pool_key', None)
+        if key is None or not self._drain(conn):
+            self.discard(http_conn)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def discard(self, http_conn):
+        """
+        Close a connection instead of returning it to the pool.
+
+        :param http_conn: tuple of (parsed url, connection object)
+        """
+        close = getattr(http_conn[1], 'close', None)
+        if close:
+            close()
+
+    def prime(self, url, count, proxy=None, **kwargs):
+        """
+        Open connections to url in parallel and add them to the idle pool,
+        so that there are count of them including those already idle.
+
+        :param url: url to connect to
+        :param count: number of connections to have open
+        :param proxy: proxy to connect through, if any
+        :param kwargs: extra arguments for :func:`http_connection`; only
+                       requests made with the same ones reuse the connections
+        """
+        http_conns = [self.get(url, proxy=proxy, **kwargs)
+                      for _junk in xrange(count)]
+        # idle connections handed out again are already connected
+        unconnected = [http_conn for http_conn in http_conns
+                       if getattr(http_conn[1], 'sock', None) is None]
+        failed = []
+
+        def _connect(http_conn):
+            try:
+                http_conn[1].connect()
+            except (socket.error, HTTPException):
+                failed.append(http_conn)
+
+        threads = [Thread(target=_connect, args=(http_conn,))
+                   for http_conn in unconnected]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for http_conn in http_conns:
+            if http_conn in failed:
+                self.discard(http_conn)
+            else:
+                self.put(http_conn)
+
+    def close(self):
+        """Close every idle connection in the pool."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.itervalues():
+            for conn in conns:
+                conn.close()
+
+    def _drain(self, conn):
+        if getattr(conn, '_HTTPConnection__state', 'Idle') != 'Idle':
+            # a request was started but its response never fetched
+            return False
+        resp = getattr(conn, '_HTTPConnection__response', None)
+        if resp is None or resp.isclosed():
+            return True
+        left = self.max_drain
+        try:
+            while left > 0 and not resp.isclosed():
+                data = resp.read(min(left, 65536))
+                if not data:
+                    break
+                left -= len(data)
+        except (socket.error, HTTPException):
+            return False
+        return resp.isclosed()
+
+
+def resolve_endpoints(url):
+    """
+    Expand the host name in url into one endpoint per A/AAAA record.
+
+    :param url: url whose host name should be resolved
+    :returns: list of 'scheme://address:port' endpoint strings
+    """
+    parsed = urlparse(encode_utf8(url))
+    port = parsed.port or {'http': 80, 'https': 443}.get(parsed.scheme)
+    endpoints = []
+    for family, _junk, _junk, _junk, sockaddr in socket.getaddrinfo(
+            parsed.hostname, port, 0, socket.SOCK_STREAM):
+        host = sockaddr[0]
+        if family == socket.AF_INET6:
+            host = '[%s]' % host
+        endpoint = '%s://%s:%s' % (parsed.scheme, host, port)
+        if endpoint not in endpoints:
+            endpoints.append(endpoint)
+    return endpoints
+
+
+class EndpointSelector(object):
+    """
+    Spread requests across several storage endpoints (proxy nodes).
+
+    Each request goes to the healthy endpoint with the fewest outstanding
+    requests, ties being broken by the connect latency measured when the
+    selector is first used. An endpoint that fails is taken out of rotation
+    for a while. A single selector is meant to be shared by every
+    :class:`Connection` talking to the same cluster.
+    """
+
+    def __init__(self, endpoints=None, resolve=False, cooldown=60,
+                 probe_timeout=2):
+        """
+        :param endpoints: list of endpoint urls, e.g. 'http://10.0.0.1:8080';
+                          only the scheme and network location are used, the
+                          path always comes from the storage URL
+        :param resolve: if True and no endpoints are given, resolve the host
+                        of the storage URL into all of its addresses
+        :param cooldown: seconds a failed endpoint is left out of rotation
+        :param probe_timeout: connect timeout used when probing latency
+        """
+        self.endpoints = []
+        for endpoint in endpoints or []:
+            parsed = urlparse(encode_utf8(endpoint))
+            self.endpoints.append('%s://%s' % (parsed.scheme, parsed.netloc))
+        self.resolve = resolve
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.latency = {}
+        self.outstanding = {}
+        self.failed_until = {}
+        self._lock = Lock()
+        self._setup_lock = Lock()
+        self._probed = False
+
+    def _setup(self, url):
+        if self._probed:
+            return
+        with self._setup_lock:
+            if self._probed:
+                return
+            if not self.endpoints and self.resolve:
+                self.endpoints = resolve_endpoints(url)
+            self.probe()
+            self._probed = True
+
+    def probe(self):
+        """Measure the connect latency of every endpoint, in parallel."""
+
+        def _probe(endpoint):
+            parsed = urlparse(endpoint)
+            port = parsed.port or {'http': 80, 'https': 443}.get(
+                parsed.scheme)
+            start = time()
+            try:
+                sock = socket.create_connection((parsed.hostname, port),
+                                                self.probe_timeout)
+            except socket.error:
+                self.mark_failed(endpoint)
+            else:
+                sock.close()
+                with self._lock:
+                    self.latency[endpoint] = time() - start
+
+        threads = [Thread(target=_probe, args=(endpoint,))
+                   for endpoint in self.endpoints]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def acquire(self, url, current=None):
+        """
+        Pick the endpoint for the next request and count it as outstanding.
+
+        :param url: storage URL the request is for
+        :param current: endpoint the caller is already connected to, if any;
+                        preferred over otherwise equal endpoints
+        :returns: the chosen endpoint, or None if there are no endpoints
+        """
+        self._setup(url)
+        if not self.endpoints:
+            return None
+        now = time()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints
+                          if self.failed_until.get(endpoint, 0) <= now]
+            if not candidates:
+                # everything has failed recently; try the least recent
+                candidates = [min(self.endpoints,
+                                  key=lambda e: self.failed_until.get(e, 0))]
+            endpoint = min(candidates, key=lambda e: (
+                self.outstanding.get(e, 0), e != current,
+                self.latency.get(e, 0)))
+            self.outstanding[endpoint] = self.outstanding.get(endpoint, 0) + 1
+        return endpoint
+
+    def release(self, endpoint):
+        """Mark a request to endpoint as finished."""
+        if endpoint is None:
+            return
+        with self._lock:
+            self.outstanding[endpoint] -= 1
+
+    def mark_failed(self, endpoint):
+        """Take endpoint out of rotation for the cooldown period."""
+        if endpoint is None:
+            return
+        with self._lock:
+            self.failed_until[endpoint] = time() + self.cooldown
+
+    def url_for(self, url, endpoint):
+        """
+        Rewrite url to go to endpoint.
+
+        :param url: storage URL
+        :param endpoint: endpoint returned by :meth:`acquire`
+        :returns: url with its scheme and network location replaced
+        """
+        if endpoint is None:
+            return url
+        parsed = list(urlparse(encode_utf8(url)))
+        parsed[:2] = urlparse(endpoint)[:2]
+        return urlunparse(parsed)
+
+
+class ConcurrencyController(object):
+    """
+    Adapt how many requests work at once to what the cluster can take.
+
+    The limit on concurrent work is raised additively while requests succeed
+    and their latency stays near the best seen, and cut multiplicatively when
+    the cluster reports overload (a 503 or 507 response, or a timeout), as
+    TCP does its congestion window. It starts by growing one per success and
+    switches to about one per round of requests at the first sign of trouble.
+    Overloads are acted on at most once per round, so one overload hitting
+    many requests at the same time cuts the limit once.
+
+    Work is done between :meth:`acquire` and :meth:`release`; the requests
+    it makes are reported with :meth:`record`, as :class:`Connection` does
+    when given a controller.
+    """
+
+    def __init__(self, ceiling, floor=1, initial=None, decrease=0.5,
+                 latency_factor=2.0):
+        """
+        :param ceiling: most work to allow at once
+        :param floor: least work to allow at once
+        :param initial: limit to start with; defaults to floor
+        :param decrease: factor the limit is multiplied by on overload
+        :param latency_factor: the limit stops growing while the smoothed
+                               latency is more than this many times the
+                               best it has been
+        """
+        self.ceiling = ceiling
+        self.floor = min(floor, ceiling)
+        self.limit = float(max(self.floor, min(initial or floor, ceiling)))
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.latency = None
+        self.best_latency = None
+        self.slow_start = True
+        self.active = 0
+        self.peak = int(self.limit)
+        self.decreases = 0
+        self.decreased_at = 0
+        self._cond = Condition(Lock())
+
+    def acquire(self):
+        """Wait until the limit allows one more piece of work to start."""
+        with self._cond:
+            while self.active >= int(self.limit):
+                self._cond.wait()
+            self.active += 1
+
+    def release(self):
+        """Account for a piece of work started with acquire having ended."""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def record(self, latency, overloaded=False):
+        """
+        Adjust the limit for a request having been made.
+
+        :param latency: seconds the request took
+        :param overloaded: the request failed because the cluster is
+                           overloaded
+        """
+        with self._cond:
+            if overloaded:
+                now = time()
+                if now - self.decreased_at >= (self.latency or 0):
+                    self.limit = max(self.floor, self.limit * self.decrease)
+                    self.decreased_at = now
+                    self.decreases += 1
+                self.slow_start = False
+                return
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency = 0.8 * self.latency + 0.2 * latency
+            if self.best_latency is None or \
+                    self.latency < self.best_latency:
+                self.best_latency = self.latency
+            if self.latency > self.latency_factor * self.best_latency:
+                self.slow_start = False
+                return
+            if self.slow_start:
+                self.limit += 1
+            else:
+                self.limit += 1 / self.limit
+            self.limit = min(self.limit, self.ceiling)
+            self.peak = max(self.peak, int(self.limit))
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        :returns: a dict with the current 'limit', the 'ceiling', the highest
+                  limit reached ('peak'), how many times the limit was cut
+                  ('decreases') and the smoothed 'latency' in seconds
+        """
+        with self._cond:
+            return {'limit': int(self.limit), 'ceiling': self.ceiling,
+                    'peak': self.peak, 'decreases': self.decreases,
+                    'latency': self.latency}
+
+
 def get_auth_1_0(url, user, key, snet):
     parsed, conn = http_connection(url)
     method = 'GET'
@@ -665,8 +1407,169 @@ def delete_container(url, token, container, http_conn=None):
                               http_response_content=body)
 
 
+class BufferPool(object):
+    """
+    Keep bytearrays around between downloads so they can be reused.
+
+    Buffers are kept per size, at most max_buffers of each.
+    """
+
+    def __init__(self, max_buffers=16):
+        """
+        :param max_buffers: most idle buffers of one size to keep
+        """
+        self.max_buffers = max_buffers
+        self._buffers = {}
+        self._lock = Lock()
+
+    def get(self, size):
+        """Return an idle buffer of size bytes, or a new one."""
+        with self._lock:
+            buffers = self._buffers.get(size)
+            if buffers:
+                return buffers.pop()
+        return bytearray(size)
+
+    def put(self, buf):
+        """Return buf to the pool once nothing refers to its contents."""
+        with self._lock:
+            buffers = self._buffers.setdefault(len(buf), [])
+            if len(buffers) < self.max_buffers:
+                buffers.append(buf)
+
+
+buffer_pool = BufferPool()
+
+
+def _response_readinto(resp, view):
+    """
+    Read the next part of resp's body into view, a memoryview (or on Python
+    2.6 a bytearray).
+
+    Bodies with a known length are received straight into view from the
+    socket; chunked bodies (and anything that is not an httplib response, or
+    anything at all on Python 2.6) are read into a string and copied.
+
+    :returns: the number of bytes read, 0 at the end of the body
+    """
+    fp = getattr(resp, 'fp', None)
+    sock = getattr(fp, '_sock', None)
+    rbuf = getattr(fp, '_rbuf', None)
+    if memoryview is None or sock is None or \
+            getattr(resp, 'chunked', True) or \
+            getattr(resp, 'length', None) is None or \
+            rbuf is None or rbuf.tell():
+        data = resp.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+    if not resp.length:
+        # recv_into would take a size of 0 to mean all of view, and block
+        resp.close()
+        return 0
+    size = sock.recv_into(view, min(len(view), resp.length))
+    if not size and resp.length:
+        resp.close()
+        raise IncompleteRead('', resp.length)
+    resp.length -= size
+    if not resp.length:
+        resp.close()
+    return size
+
+
+class ObjectBody(object):
+    """
+    An object's contents, read into one reused buffer.
+
+    Iterating yields memoryview slices of the buffer; each is only valid until
+    the next one is requested, so copy it (with ``tobytes()``) to keep it.
+    Alternatively call :meth:`readinto` with a buffer of your own. Python 2.6
+    has no memoryview, so there iterating yields strings instead.
+    """
+
+    def __init__(self, resp, buf, monitor=None, pool=None, sizer=None,
+                 limiter=None):
+        """
+        :param resp: HTTP response whose body is to be read
+        :param buf: bytearray to read the body into
+        :param monitor: :class:`ThroughputMonitor` to report progress to
+        :param pool: :class:`BufferPool` to give buf back to once the body has
+                     been read or the reader is closed
+        :param sizer: :class:`AdaptiveChunkSizer` to pick the size of each
+                      item from (up to the size of buf)
+        :param limiter: :class:`RateLimiter` to take tokens from for each read
+        """
+        self.resp = resp
+        self.buf = buf
+        self.view = memoryview and memoryview(buf)
+        self.monitor = monitor
+        self.pool = pool
+        self.sizer = sizer
+        self.limiter = limiter
+        if sizer:
+            sizer.start()
+
+    def readinto(self, b):
+        """
+        Read up to len(b) bytes of the body into b.
+
+        :returns: the number of bytes read, 0 at the end of the body
+        """
+        if memoryview:
+            b = memoryview(b)
+        size = _response_readinto(self.resp, b)
+        self._consumed(size)
+        return size
+
+    def _consumed(self, size):
+        if size:
+            if self.limiter:
+                self.limiter.take(size)
+            if self.monitor:
+                self.monitor.update(size)
+            if self.sizer:
+                self.sizer.update(size)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self.buf is None:
+            raise StopIteration
+        if memoryview is None:
+            size = len(self.buf)
+            if self.sizer:
+                size = min(size, self.sizer.size)
+            data = self.resp.read(size)
+            self._consumed(len(data))
+            if not data:
+                self.close()
+                raise StopIteration
+            return data
+        view = self.view
+        if self.sizer:
+            view = view[:self.sizer.size]
+        size = self.readinto(view)
+        if not size:
+            self.close()
+            raise StopIteration
+        return self.view[:size]
+
+    __next__ = next
+
+    def close(self):
+        """Stop using the buffer, giving it back to its pool if it has one."""
+        if self.buf is None:
+            return
+        self.view = None
+        if self.pool:
+            self.pool.put(self.buf)
+        self.buf = None
+
+
 def get_object(url, token, container, name, http_conn=None,
-               resp_chunk_size=None, query_string=None):
+               resp_chunk_size=None, query_string=None,
+               min_throughput=None, resp_buffer=None, max_body_size=None,
+               chunk_sizer=None, headers=None, rate_limiter=None):
     """
     Get an object
 
@@ -681,9 +1584,29 @@ def get_object(url, token, container, name, http_conn=None,
                             the object's contents before making another
                             request.
     :param query_string: if set will be appended with '?' to generated path
+    :param min_throughput: if set, reading the body raises socket.timeout
+                           when it goes slower than this many bytes per
+                           second
+    :param resp_buffer: if set, the object's contents are returned as an
+                        :class:`ObjectBody` reading into this bytearray, or
+                        into a pooled one of resp_chunk_size (default 64K)
+                        bytes if resp_buffer is True. The same rule as for
+                        resp_chunk_size applies about reading it fully.
+    :param max_body_size: if set, refuse to read more than this many bytes
+                          into memory when neither resp_chunk_size nor
+                          resp_buffer is given
+    :param chunk_sizer: if set, an :class:`AdaptiveChunkSizer` that picks the
+                        size of each chunk read when resp_chunk_size or
+                        resp_buffer is given
+    :param headers: additional headers to include in the request, such as
+                    Range or If-Match
+    :param rate_limiter: if set, a :class:`RateLimiter` that reading the body
+                         takes tokens from; the body is then read in chunks
+                         even when resp_chunk_size is not given
     :returns: a tuple of (response headers, the object's contents) The response
               headers will be a dict and all header names will be lowercase.
-    :raises ClientException: HTTP GET request failed
+    :raises ClientException: HTTP GET request failed, or the object is bigger
+                             than max_body_size
     """
     if http_conn:
         parsed, conn = http_conn
@@ -693,7 +1616,8 @@ def get_object(url, token, container, name, http_conn=None,
     if query_string:
         path += '?' + query_string
     method = 'GET'
-    headers = {'X-Auth-Token': token}
+    headers = dict(headers or {})
+    headers['X-Auth-Token'] = token
     conn.request(method, path, '', headers)
     resp = conn.getresponse()
     if resp.status < 200 or resp.status >= 300:
@@ -705,14 +1629,56 @@ def get_object(url, token, container, name, http_conn=None,
                               http_path=path, http_status=resp.status,
                               http_reason=resp.reason,
                               http_response_content=body)
-    if resp_chunk_size:
-
-        def _object_body():
-            buf = resp.read(resp_chunk_size)
-            while buf:
-                yield buf
-                buf = resp.read(resp_chunk_size)
-        object_body = _object_body()
+    monitor = None
+    if min_throughput:
+        monitor = ThroughputMonitor(min_throughput)
+
+    def _object_body(chunk_size, sizer=None):
+        if sizer:
+            sizer.start()
+        while True:
+            buf = resp.read(sizer.size if sizer else chunk_size)
+            if not buf:
+                break
+            if rate_limiter:
+                rate_limiter.take(len(buf))
+            if monitor:
+                monitor.update(len(buf))
+            if sizer:
+                sizer.update(len(buf))
+            yield buf
+    if resp_buffer is True:
+        if chunk_sizer:
+            resp_chunk_size = chunk_sizer.max_size
+        object_body = ObjectBody(
+            resp, buffer_pool.get(resp_chunk_size or 65536), monitor,
+            buffer_pool, chunk_sizer, rate_limiter)
+    elif resp_buffer:
+        object_body = ObjectBody(resp, resp_buffer, monitor,
+                                 sizer=chunk_sizer, limiter=rate_limiter)
+    elif resp_chunk_size:
+        object_body = _object_body(resp_chunk_size, chunk_sizer)
+    elif max_body_size is not None:
+        def _too_big():
+            conn.close()
+            return ClientException(
+                'Object GET refused: body is larger than max_body_size of %s'
+                % max_body_size, http_scheme=parsed.scheme,
+                http_host=conn.host, http_port=conn.port, http_path=path,
+                http_status=resp.status, http_reason=resp.reason)
+        length = resp.getheader('content-length')
+        if length is not None and int(length) > max_body_size:
+            raise _too_big()
+        object_body = []
+        size = 0
+        for chunk in _object_body(65536):
+            size += len(chunk)
+            if size > max_body_size:
+                raise _too_big()
+            object_body.append(chunk)
+        object_body = ''.join(object_body)
+    elif monitor or rate_limiter:
+        object_body = ''.join(_object_body(65536))
     else:
         object_body = resp.read()
     resp_headers = {}
@@ -761,10 +1727,138 @@ def head_object(url, token, container, name, http_conn=None):
     return resp_headers
 
 
+def _can_sendfile(conn, contents):
+    """
+    Check whether contents can be sent on conn with sendfile(2): it has to be
+    a regular file and the connection a plain (not SSL) socket.
+    """
+    if sendfile is None:
+        return False
+    sock = getattr(conn, 'sock', None)
+    if sock is None or isinstance(sock, ssl.SSLSocket):
+        return False
+    try:
+        sock.fileno()
+        mode = os.fstat(contents.fileno()).st_mode
+    except (AttributeError, IOError, OSError, ValueError, socket.error):
+        return False
+    return stat.S_ISREG(mode)
+
+
+def _sendfile(sock, contents, length, chunk_size, monitor=None, sizer=None,
+              limiter=None, md5sum=None):
+    """
+    Send up to length bytes of contents, from its current position, straight
+    from the page cache to sock.
+
+    The file position is moved past whatever was sent, so anything left over
+    (if sendfile(2) turns out not to work for this file) can be sent by
+    reading contents as usual. If md5sum is given each part sent is read
+    back, while it is still in the page cache, to update it.
+
+    :returns: number of bytes sent
+    """
+    start = offset = contents.tell()
+    in_fd = contents.fileno()
+    out_fd = sock.fileno()
+    left = length
+    try:
+        while left > 0:
+            try:
+                if sizer:
+                    chunk_size = sizer.size
+                sent = sendfile(out_fd, in_fd, offset, min(left, chunk_size))
+            except OSError as err:
+                if err.errno == errno.EAGAIN:
+                    # the socket has a timeout, so it is non-blocking
+                    if not select.select([], [sock], [],
+                                         sock.gettimeout())[1]:
+                        raise socket.timeout('timed out')
+                    continue
+                if offset == start and err.errno in (
+                        errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                    # not supported for this file; fall back to reading it
+                    break
+                raise socket.error(err.errno, err.strerror)
+            if not sent:
+                # end of file
+                break
+            if md5sum:
+                contents.seek(offset)
+                md5sum.update(contents.read(sent))
+            offset += sent
+            left -= sent
+            if limiter:
+                limiter.take(sent)
+            if monitor:
+                monitor.update(sent)
+            if sizer:
+                sizer.update(sent)
+    finally:
+        contents.seek(offset)
+    return offset - start
+
+
+def _send_chunked(conn, contents, chunk_size, monitor=None, sizer=None,
+                  md5sum=None, limiter=None):
+    """
+    Send contents with chunked transfer encoding.
+
+    Each chunk is read straight into a buffer that already has room for its
+    framing (using readinto where contents supports it), so it goes out in a
+    single send without formatting a new string around the payload; only a
+    read returning more than was asked for (or any read, on Python 2.6) is
+    framed on its own. If md5sum is given it is updated with each chunk
+    sent.
+    """
+    if sizer:
+        chunk_size = sizer.max_size
+    head_room = len('%x\r\n' % chunk_size)
+    view = None
+    if memoryview:
+        view = memoryview(bytearray(head_room + chunk_size + 2))
+    readinto = view and getattr(contents, 'readinto', None)
+    while True:
+        if sizer:
+            chunk_size = sizer.size
+        framed = False
+        if readinto:
+            payload = view[head_room:head_room + chunk_size]
+            size = readinto(payload)
+        else:
+            payload = encode_utf8(contents.read(chunk_size))
+            size = len(payload)
+            # more than was asked for doesn't fit the buffer
+            framed = view is None or size > chunk_size
+            if not framed:
+                view[head_room:head_room + size] = payload
+                payload = view[head_room:head_room + size]
+        if not size:
+            break
+        if md5sum:
+            md5sum.update(payload[:size])
+        if limiter:
+            limiter.take(size)
+        if framed:
+            conn.send('%x\r\n%s\r\n' % (size, payload))
+        else:
+            head = '%x\r\n' % size
+            start = head_room - len(head)
+            view[start:head_room] = head
+            view[head_room + size:head_room + size + 2] = '\r\n'
+            conn.send(view[start:head_room + size + 2])
+        if monitor:
+            monitor.update(size)
+        if sizer:
+            sizer.update(size)
+    conn.send('0\r\n\r\n')
+
+
 def put_object(url, token=None, container=None, name=None, contents=None,
                content_length=None, etag=None, chunk_size=None,
                content_type=None, headers=None, http_conn=None, proxy=None,
-               query_string=None):
+               query_string=None, min_throughput=None, chunk_sizer=None,
+               response_dict=None, checksum=False, rate_limiter=None):
     """
     Put an object
 
@@ -775,7 +1869,9 @@ def put_object(url, token=None, container=None, name=None, contents=None,
     :param name: object name to put; if None, the object name is expected to be
                  part of the url
     :param contents: a string or a file like object to read object data from;
-                     if None, a zero-byte put will be done
+                     if None, a zero-byte put will be done; regular files of
+                     known content_length are sent with sendfile(2) over
+                     plain HTTP connections where it is available
     :param content_length: value to send as content-length header; also limits
                            the amount read from contents; if None, it will be
                            computed via the contents or chunked transfer
@@ -793,8 +1889,29 @@ def put_object(url, token=None, container=None, name=None, contents=None,
     :param proxy: proxy to connect through, if any; None by default; str of the
                   format 'http://127.0.0.1:8888' to set one
     :param query_string: if set will be appended with '?' to generated path
+    :param min_throughput: if set, raise socket.timeout when sending the
+                           contents goes slower than this many bytes per
+                           second; used only if the contents object has a
+                           'read' method
+    :param chunk_sizer: if set, an :class:`AdaptiveChunkSizer` that picks the
+                        size of each chunk sent instead of chunk_size
+    :param response_dict: if set, a dict that gets the response's 'status',
+                          'reason', 'headers' (with lowercase names) and
+                          'body'; e.g. for the report of an extract-archive
+                          upload
+    :param checksum: if True, the MD5 of the contents is computed as they are
+                     sent (with sendfile(2), by reading back what it sent)
+                     and checked against the etag the server returns; the
+                     MD5 of a string is also sent as the ETag header
+    :param rate_limiter: if set, a :class:`RateLimiter` that sending the
+                         contents takes tokens from
     :returns: etag from server response
-    :raises ClientException: HTTP PUT request failed
+    :raises ClientException: HTTP PUT request failed, or with checksum, the
+                             returned etag is not the MD5 of what was sent
+                             (with http_status 422, as when the server finds
+                             that an ETag header does not match, and a true
+                             checksum_mismatch attribute, which
+                             :class:`Connection` retries on)
     """
     if http_conn:
         parsed, conn = http_conn
@@ -825,38 +1942,66 @@ def put_object(url, token=None, container=None, name=None, contents=None,
         headers['Content-Type'] = content_type
     if not contents:
         headers['Content-Length'] = '0'
+    md5sum = None
+    if checksum:
+        md5sum = md5()
+        if not hasattr(contents, 'read'):
+            md5sum.update(encode_utf8(contents or ''))
+            headers.setdefault('ETag', md5sum.hexdigest())
     if hasattr(contents, 'read'):
         if chunk_size is None:
             chunk_size = 65536
+        monitor = None
+        if min_throughput:
+            monitor = ThroughputMonitor(min_throughput)
+        if chunk_sizer:
+            chunk_sizer.start()
         conn.putrequest('PUT', path)
         for header, value in headers.iteritems():
             conn.putheader(header, value)
         if content_length is None:
             conn.putheader('Transfer-Encoding', 'chunked')
             conn.endheaders()
-            chunk = contents.read(chunk_size)
-            while chunk:
-                conn.send('%x\r\n%s\r\n' % (len(chunk), chunk))
-                chunk = contents.read(chunk_size)
-            conn.send('0\r\n\r\n')
+            _send_chunked(conn, contents, chunk_size, monitor, chunk_sizer,
+                          md5sum, rate_limiter)
         else:
             conn.endheaders()
             left = content_length
+            if _can_sendfile(conn, contents):
+                left -= _sendfile(conn.sock, contents, content_length,
+                                  chunk_size, monitor, chunk_sizer,
+                                  rate_limiter, md5sum)
             while left > 0:
                 size = chunk_size
+                if chunk_sizer:
+                    size = chunk_sizer.size
                 if size > left:
                     size = left
                 chunk = contents.read(size)
+                if rate_limiter:
+                    rate_limiter.take(len(chunk))
                 conn.send(chunk)
+                if md5sum:
+                    md5sum.update(chunk)
+                if monitor:
+                    monitor.update(len(chunk))
+                if chunk_sizer:
+                    chunk_sizer.update(len(chunk))
                 left -= len(chunk)
     else:
         if chunk_size is not None:
             warn_msg = '%s object has no \"read\" method, ignoring chunk_size'\
                 % type(contents).__name__
             warnings.warn(warn_msg, stacklevel=2)
+        if rate_limiter and contents:
+            rate_limiter.take(len(contents))
         conn.request('PUT', path, contents, headers)
     resp = conn.getresponse()
     body = resp.read()
+    if response_dict is not None:
+        response_dict.update(
+            status=resp.status, reason=resp.reason, body=body,
+            headers=dict((h.lower(), v) for h, v in resp.getheaders()))
     headers = {'X-Auth-Token': token}
     http_log(('%s%s' % (url.replace(parsed.path, ''), path), 'PUT',),
              {'headers': headers}, resp, body)
@@ -866,7 +2011,18 @@ def put_object(url, token=None, container=None, name=None, contents=None,
                               http_path=path, http_status=resp.status,
                               http_reason=resp.reason,
                               http_response_content=body)
-    return resp.getheader('etag', '').strip('"')
+    resp_etag = resp.getheader('etag', '').strip('"')
+    if md5sum and resp_etag and resp_etag != md5sum.hexdigest():
+        err = ClientException(
+            'Object PUT failed: etag %s is not the MD5 of the data sent, %s'
+            % (resp_etag, md5sum.hexdigest()), http_scheme=parsed.scheme,
+            http_host=conn.host, http_port=conn.port, http_path=path,
+            http_status=422, http_reason='Unprocessable Entity')
+        # unlike a 422 from the server, which means a wrong ETag was given,
+        # this is worth sending the data again for
+        err.checksum_mismatch = True
+        raise err
+    return resp_etag
 
 
 def post_object(url, token, container, name, headers, http_conn=None):
@@ -950,13 +2106,116 @@ def delete_object(url, token=None, container=None, name=None, http_conn=None,
                               http_response_content=body)
 
 
+def get_capabilities(url, token=None, http_conn=None):
+    """
+    Get the capabilities the cluster reports at /info
+
+    :param url: storage URL (only its scheme and host are used)
+    :param token: auth token; if None, no token will be sent
+    :param http_conn: HTTP connection object (If None, it will create the
+                      conn object)
+    :returns: a dict of the capabilities, keyed by middleware name
+    :raises ClientException: HTTP GET request failed
+    """
+    if http_conn:
+        parsed, conn = http_conn
+    else:
+        parsed, conn = http_connection(url)
+    path = '/info'
+    headers = {}
+    if token:
+        headers['X-Auth-Token'] = token
+    conn.request('GET', path, '', headers)
+    resp = conn.getresponse()
+    body = resp.read()
+    http_log(('%s://%s%s' % (parsed.scheme, parsed.netloc, path), 'GET',),
+             {'headers': headers}, resp, body)
+    if resp.status < 200 or resp.status >= 300:
+        raise ClientException('Capabilities GET failed',
+                              http_scheme=parsed.scheme, http_host=conn.host,
+                              http_port=conn.port, http_path=path,
+                              http_status=resp.status, http_reason=resp.reason,
+                              http_response_content=body)
+    return json_loads(body)
+
+
+def bulk_delete(url, token, paths, http_conn=None):
+    """
+    Delete objects (and empty containers) in one request, using the cluster's
+    bulk delete middleware
+
+    :param url: storage URL
+    :param token: auth token
+    :param paths: list of 'container/object' (or 'container') names to delete;
+                  no more than the cluster's max_deletes_per_request
+    :param http_conn: HTTP connection object (If None, it will create the
+                      conn object)
+    :returns: a dict with the numbers of paths 'deleted' and 'not_found', and
+              'errors', a list of (path, status) for the paths that could not
+              be deleted, each path as it was given in paths
+    :raises ClientException: HTTP POST request failed, or the cluster does
+                             not support bulk delete
+    """
+    if http_conn:
+        parsed, conn = http_conn
+    else:
+        parsed, conn = http_connection(url)
+    path = '%s?bulk-delete' % parsed.path
+    headers = {'X-Auth-Token': token, 'Content-Type': 'text/plain',
+               'Accept': 'application/json'}
+    body = '\n'.join(quote('/' + p.lstrip('/')) for p in paths)
+    conn.request('POST', path, body, headers)
+    resp = conn.getresponse()
+    body = resp.read()
+    http_log(('%s%s' % (url.replace(parsed.path, ''), path), 'POST',),
+             {'headers': headers}, resp, body)
+
+    def _failed(message, status=None):
+        return ClientException(message, http_scheme=parsed.scheme,
+                               http_host=conn.host, http_port=conn.port,
+                               http_path=path,
+                               http_status=status or resp.status,
+                               http_reason=resp.reason,
+                               http_response_content=body)
+    if resp.status < 200 or resp.status >= 300:
+        raise _failed('Bulk delete failed')
+    try:
+        # the middleware sends whitespace while it works, then the results
+        result = json_loads(body.strip())
+        status = int(result['Response Status'].split()[0])
+    except (ValueError, KeyError, AttributeError, TypeError):
+        # without the middleware this was an ordinary account POST
+        raise _failed('Bulk delete not supported')
+    # the middleware may report failed paths quoted or not; either way
+    # they are given back as they were passed in
+    sent = {}
+    for p in paths:
+        name = encode_utf8('/' + p.lstrip('/'))
+        sent[name] = sent[quote(name)] = p
+    errors = [(sent.get(encode_utf8(p), unquote(encode_utf8(p))), s)
+              for p, s in result.get('Errors') or []]
+    if (status < 200 or status >= 300) and not errors:
+        raise _failed('Bulk delete failed: %s' % result.get('Response Body'),
+                      status)
+    return {'deleted': result.get('Number Deleted', 0),
+            'not_found': result.get('Number Not Found', 0),
+            'errors': errors}
+
+
 class Connection(object):
     """Convenience class to make requests that will also retry the request"""
 
     def __init__(self, authurl=None, user=None, key=None, retries=5,
                  preauthurl=None, preauthtoken=None, snet=False,
                  starting_backoff=1, tenant_name=None, os_options=None,
-                 auth_version="1", cacert=None, insecure=False):
+                 auth_version="1", cacert=None, insecure=False,
+                 pool=None, endpoints=None, connect_timeout=None,
+                 read_timeout=None, deadline=None, min_throughput=None,
+                 max_body_size=None, adaptive_chunk_size=False,
+                 min_chunk_size=16384, max_chunk_size=4194304,
+                 listing_concurrency=1, listing_cache=None,
+                 download_concurrency=1, upload_limiter=None,
+                 download_limiter=None, concurrency=None):
         """
         :param authurl: authentication URL
         :param user: user name to authenticate as
@@ -973,8 +2232,50 @@ class Connection(object):
         :param os_options: The OpenStack options which can have tenant_id,
                            auth_token, service_type, endpoint_type,
                            tenant_name, object_storage_url, region_name
-        :param insecure: Allow to access insecure keystone server.
-                         The keystone's certificate will not be verified.
+        :param cacert: CA bundle file to verify keystone and storage server
+                       certificates with.
+        :param insecure: Allow to access insecure keystone and storage
+                         servers. Their certificates will not be verified.
+        :param pool: :class:`ConnectionPool` to take HTTP connections from and
+                     release them to; if None, each Connection opens its own
+        :param endpoints: list of storage endpoint urls, or a shared
+                          :class:`EndpointSelector`, to spread requests over
+                          instead of always using the storage URL's host
+        :param connect_timeout: timeout in seconds for establishing each HTTP
+                                connection
+        :param read_timeout: timeout in seconds for each send and receive on
+                             an established HTTP connection
+        :param deadline: overall time limit in seconds for each operation,
+                         including every retry and backoff sleep; once it has
+                         passed the last error is raised
+        :param min_throughput: minimum rate in bytes per second for object
+                               transfers; slower uploads (and downloads read
+                               in full) are aborted and retried on a fresh
+                               connection
+        :param max_body_size: largest object get_object will read into memory
+                              in one piece; see :func:`get_object`
+        :param adaptive_chunk_size: pick the chunk size of object transfers
+                                    from the throughput measured on this
+                                    connection instead of using a fixed one;
+                                    see :class:`AdaptiveChunkSizer`, kept as
+                                    the chunk_sizer attribute
+        :param min_chunk_size: smallest chunk size the adaptive mode uses
+        :param max_chunk_size: largest chunk size the adaptive mode uses
+        :param listing_concurrency: default number of name ranges
+                                    :meth:`iter_container` lists at once
+        :param listing_cache: :class:`swiftclient.cache.ListingCache` to
+                              answer container listings from while a HEAD
+                              of the container shows it is unchanged
+        :param download_concurrency: default number of ranges
+                                     :meth:`download_object` fetches at once
+        :param upload_limiter: :class:`RateLimiter` that object uploads take
+                               tokens from; share one between Connections to
+                               cap their combined rate
+        :param download_limiter: :class:`RateLimiter` that object downloads
+                                 take tokens from
+        :param concurrency: :class:`ConcurrencyController` to report the
+                            latency of each request attempt to, and
+                            attempts failing with 503, 507 or a timeout
         """
         self.authurl = authurl
         self.user = user
@@ -992,6 +2293,28 @@ class Connection(object):
             self.os_options['tenant_name'] = tenant_name
         self.cacert = cacert
         self.insecure = insecure
+        self.pool = pool
+        if endpoints is not None and \
+                not isinstance(endpoints, EndpointSelector):
+            endpoints = EndpointSelector(endpoints)
+        self.endpoints = endpoints
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.min_throughput = min_throughput
+        self.max_body_size = max_body_size
+        self.chunk_sizer = None
+        if adaptive_chunk_size:
+            self.chunk_sizer = AdaptiveChunkSizer(min_chunk_size,
+                                                  max_chunk_size)
+        self.listing_concurrency = listing_concurrency
+        # the most names the cluster lists in a page; 0 if it can't be told
+        self.listing_limit = None
+        self.listing_cache = listing_cache
+        self.download_concurrency = download_concurrency
+        self.upload_limiter = upload_limiter
+        self.download_limiter = download_limiter
+        self.concurrency = concurrency
 
     def get_auth(self):
         return get_auth(self.authurl,
@@ -1003,29 +2326,116 @@ class Connection(object):
                         cacert=self.cacert,
                         insecure=self.insecure)
 
-    def http_connection(self):
-        return http_connection(self.url)
+    def _http_kwargs(self):
+        kwargs = {}
+        if self.connect_timeout is not None:
+            kwargs['connect_timeout'] = self.connect_timeout
+        if self.read_timeout is not None:
+            kwargs['read_timeout'] = self.read_timeout
+        if self.cacert:
+            kwargs['cacert'] = self.cacert
+        if self.insecure:
+            kwargs['insecure'] = self.insecure
+        return kwargs
+
+    def http_connection(self, url=None):
+        url = url or self.url
+        if self.pool:
+            return self.pool.get(url, **self._http_kwargs())
+        return http_connection(url, **self._http_kwargs())
+
+    def prime(self, count):
+        """
+        Open count connections to the storage URL in parallel, ready for
+        this Connection and its clones to use; does nothing without a pool
+        or before authenticating.
+
+        :param count: number of connections to have open
+        """
+        if self.pool and self.url:
+            self.pool.prime(self.url, count, **self._http_kwargs())
+
+    def clone(self):
+        """
+        Return a Connection with the same settings and credentials (sharing
+        any pool and endpoints) but an HTTP connection, and adaptive chunk
+        sizer, of its own, for making requests alongside this one.
+        """
+        conn = copy.copy(self)
+        conn.http_conn = None
+        conn.attempts = 0
+        if self.chunk_sizer:
+            # timings taken on the clone's connection are its own
+            sizer = self.chunk_sizer
+            conn.chunk_sizer = AdaptiveChunkSizer(
+                sizer.min_size, sizer.max_size, sizer.size,
+                sizer.target_interval)
+        return conn
+
+    def close(self):
+        """Release the HTTP connection, returning it to the pool if any."""
+        if self.http_conn and self.pool:
+            self.pool.put(self.http_conn)
+        self.http_conn = None
+
+    def _current_endpoint(self):
+        if not self.http_conn:
+            return None
+        parsed = self.http_conn[0]
+        return '%s://%s' % (parsed.scheme, parsed.netloc)
+
+    def _expired(self, deadline):
+        return deadline is not None and time() >= deadline
+
+    def _discard_http_conn(self):
+        if self.http_conn and self.pool:
+            self.pool.discard(self.http_conn)
+        self.http_conn = None
 
     def _retry(self, reset_func, func, *args, **kwargs):
         self.attempts = 0
         backoff = self.starting_backoff
+        deadline = None
+        if self.deadline is not None:
+            deadline = time() + self.deadline
         while self.attempts <= self.retries:
             self.attempts += 1
+            endpoint = None
+            started = time()
             try:
                 if not self.url or not self.token:
                     self.url, self.token = self.get_auth()
-                    self.http_conn = None
+                    self.close()
+                url = self.url
+                if self.endpoints:
+                    endpoint = self.endpoints.acquire(
+                        url, current=self._current_endpoint())
+                    url = self.endpoints.url_for(url, endpoint)
+                    if self.http_conn and \
+                            self.http_conn[0].netloc != urlparse(url).netloc:
+                        self.close()
                 if not self.http_conn:
-                    self.http_conn = self.http_connection()
+                    self.http_conn = self.http_connection(url)
                 kwargs['http_conn'] = self.http_conn
-                rv = func(self.url, self.token, *args, **kwargs)
+                started = time()
+                rv = func(url, self.token, *args, **kwargs)
+                if self.concurrency:
+                    self.concurrency.record(time() - started)
                 return rv
-            except (socket.error, HTTPException):
-                if self.attempts > self.retries:
+            except (socket.error, HTTPException) as err:
+                failure = sys.exc_info()
+                if self.concurrency and isinstance(err, socket.timeout):
+                    self.concurrency.record(time() - started, True)
+                self._discard_http_conn()
+                if self.endpoints:
+                    self.endpoints.mark_failed(endpoint)
+                if self.attempts > self.retries or self._expired(deadline):
                     raise
-                self.http_conn = None
             except ClientException as err:
-                if self.attempts > self.retries:
+                failure = sys.exc_info()
+                if self.concurrency and err.http_status in (408, 503, 507):
+                    self.concurrency.record(time() - started, True)
+                if self.attempts > self.retries or self._expired(deadline):
                     raise
                 if err.http_status == 401:
                     self.url = self.token = None
@@ -1034,12 +2444,27 @@ class Connection(object):
                                                      self.key)):
                         raise
                 elif err.http_status == 408:
-                    self.http_conn = None
+                    self._discard_http_conn()
+                    if self.endpoints:
+                        self.endpoints.mark_failed(endpoint)
+                elif getattr(err, 'checksum_mismatch', False):
+                    # the data was damaged on the way; send it again
+                    self._discard_http_conn()
                 elif 500 <= err.http_status <= 599:
-                    pass
+                    if self.endpoints:
+                        self.endpoints.mark_failed(endpoint)
                 else:
                     raise
-            sleep(backoff)
+            finally:
+                if self.endpoints:
+                    self.endpoints.release(endpoint)
+            if deadline is None:
+                sleep(backoff)
+            else:
+                sleep(max(0, min(backoff, deadline - time())))
+                if self._expired(deadline):
+                    # no time left for another attempt
+                    raise failure[0], failure[1], failure[2]
             backoff *= 2
             if reset_func:
                 reset_func(func, *args, **kwargs)
@@ -1050,14 +2475,372 @@ class Connection(object):
 
     def get_account(self, marker=None, limit=None, prefix=None,
                     end_marker=None, full_listing=False):
-        """Wrapper for :func:`get_account`"""
-        # TODO(unknown): With full_listing=True this will restart the entire
-        # listing with each retry. Need to make a better version that just
-        # retries where it left off.
+        """
+        Wrapper for :func:`get_account`
+
+        With full_listing=True a retry restarts the entire listing, and all
+        of it is kept in memory; :meth:`iter_account` does neither.
+        """
         return self._retry(None, get_account, marker=marker, limit=limit,
                            prefix=prefix, end_marker=end_marker,
                            full_listing=full_listing)
 
+    def iter_account(self, marker=None, prefix=None, end_marker=None,
+                     page_size=None, prefetch=True):
+        """
+        Generate the containers in the account, one listing page at a time.
+
+        Each page is requested (and retried) on its own, starting after the
+        last item of the page before, so a failure only repeats one page.
+
+        :param marker: start listing after this container name
+        :param prefix: only list containers whose names start with this
+        :param end_marker: stop listing before this container name
+        :param page_size: how many containers to request at a time; by
+                          default the cluster's limit
+        :param prefetch: request the next page in the background while the
+                         caller works through the current one
+        :returns: generator of container dicts, as in the listing returned by
+                  :func:`get_account`
+        """
+        return self._iter_listing(get_account, (), marker, prefetch,
+                                  prefix=prefix, end_marker=end_marker,
+                                  limit=page_size)
+
+    def iter_container(self, container, marker=None, prefix=None,
+                       delimiter=None, end_marker=None, path=None,
+                       page_size=None, prefetch=True, concurrency=None):
+        """
+        Generate the objects in a container, one listing page at a time.
+
+        See :meth:`iter_account`; the other arguments are as for
+        :func:`get_container`.
+
+        With a concurrency above 1 and no delimiter or path, a container with
+        more than one page of objects is listed in parallel: the names found
+        just after a fan-out of probe markers split the rest of the name
+        space into ranges, and that many ranges are listed at once (each
+        with marker and end_marker) and yielded in order.
+
+        With a listing_cache and no delimiter or path, the container is
+        HEADed and, if it is unchanged, listed from the cache; otherwise a
+        complete listing (no marker, prefix or end_marker) is saved to the
+        cache as it is consumed.
+
+        :param concurrency: how many ranges to list at once; by default the
+                            Connection's listing_concurrency
+        :returns: generator of object dicts (or subdir dicts, with a
+                  delimiter), as in the listing returned by
+                  :func:`get_container`
+        """
+        if concurrency is None:
+            concurrency = self.listing_concurrency
+        if delimiter or path:
+            return self._iter_listing(get_container, (container,), marker,
+                                      prefetch, prefix=prefix,
+                                      delimiter=delimiter,
+                                      end_marker=end_marker, path=path,
+                                      limit=page_size)
+
+        def live(marker, prefix, end_marker):
+            if concurrency > 1:
+                return self._iter_ranges(container, marker, prefix,
+                                         end_marker, page_size, concurrency)
+            return self._iter_listing(get_container, (container,), marker,
+                                      prefetch, prefix=prefix,
+                                      end_marker=end_marker, limit=page_size)
+        if self.listing_cache is not None:
+            return self._iter_cached(container, None, marker, prefix,
+                                     end_marker, live)
+        return live(marker, prefix, end_marker)
+
+    def _iter_cached(self, container, headers, marker, prefix, end_marker,
+                     live):
+        # live(marker, prefix, end_marker) lists the container itself
+        if headers is None:
+            headers = self.head_container(container)
+        listing = self.listing_cache.get(self.url, container, headers,
+                                         marker=marker, prefix=prefix,
+                                         end_marker=end_marker)
+        if listing is None:
+            if marker or prefix or end_marker:
+                listing = live(marker, prefix, end_marker)
+            else:
+                listing = self.listing_cache.store(self.url, container,
+                                                   headers,
+                                                   live(None, None, None))
+        for item in listing:
+            yield item
+
+    def _changed(self, container):
+        # drop the cached listing of a container this has changed
+        if self.listing_cache is not None and self.url:
+            self.listing_cache.invalidate(self.url, container)
+
+    def _iter_listing(self, func, args, marker, prefetch, **kwargs):
+        # Pages are fetched with a clone, so the caller is free to use this
+        # Connection between items.
+        lister = self.clone()
+
+        def fetch(marker, result):
+            try:
+                result.append(lister._retry(None, func, *args, marker=marker,
+                                            **kwargs)[1])
+            except Exception:
+                result.append(sys.exc_info())
+            if lister.token and lister.token != self.token:
+                self.url, self.token = lister.url, lister.token
+
+        result = []
+        thread = None
+        try:
+            fetch(marker, result)
+            while True:
+                page = result.pop()
+                if isinstance(page, tuple):
+                    raise page[0], page[1], page[2]
+                if not page:
+                    return
+                last = page[-1]
+                marker = last.get('name', last.get('subdir'))
+                if prefetch:
+                    thread = Thread(target=fetch, args=(marker, result))
+                    thread.daemon = True
+                    thread.start()
+                for item in page:
+                    yield item
+                if thread:
+                    thread.join()
+                    thread = None
+                else:
+                    fetch(marker, result)
+        finally:
+            if thread:
+                thread.join()
+            lister.close()
+
+    def _map(self, func, items, concurrency):
+        # [func(conn, item) for item in items], run by up to concurrency
+        # threads, each with a clone of its own
+        items = list(items)
+        results = [None] * len(items)
+        errors = []
+        todo = iter(xrange(len(items)))
+        lock = Lock()
+
+        def work():
+            conn = self.clone()
+            try:
+                while not errors:
+                    with lock:
+                        i = next(todo, None)
+                    if i is None:
+                        return
+                    results[i] = func(conn, items[i])
+            except Exception:
+                errors.append(sys.exc_info())
+            finally:
+                conn.close()
+
+        threads = [Thread(target=work)
+                   for _ in xrange(min(concurrency, len(items)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+        return results
+
+    def _container_listing_limit(self):
+        if self.listing_limit is None:
+            try:
+                info = self.get_capabilities()
+                self.listing_limit = int(
+                    info['swift']['container_listing_limit'])
+            except (ClientException, HTTPException, socket.error, KeyError,
+                    TypeError, ValueError):
+                self.listing_limit = 0
+        return self.listing_limit
+
+    def _sample_names(self, container, lo, prefix, end_marker, wanted,
+                      max_probes, concurrency):
+        # Split the names after lo into gaps between names found so far, and
+        # each round ask for the first name after a few markers spread over
+        # each of the widest gaps (see _probe_markers and _name_position). A
+        # marker finding nothing before the end of its gap narrows the gap to
+        # below it; one finding a name splits the gap in two. Rounds go on
+        # until enough names are found.
+        def probe(conn, marker):
+            listing = conn._retry(None, get_container, container,
+                                  marker=marker, limit=1, prefix=prefix,
+                                  end_marker=end_marker)[1]
+            return listing[0] if listing else None
+
+        def width(gap):
+            return _name_position(gap[1], prefix) - \
+                _name_position(gap[0], prefix)
+
+        found = {}
+        # (low, limit, high): the names between low and high are before limit
+        gaps = [(lo, end_marker, end_marker)]
+        probes = 0
+        while gaps and len(found) < wanted and probes < max_probes:
+            budget = min(max(concurrency, 2), max_probes - probes)
+            count = max(2, budget // len(gaps))
+            probing = []
+            waiting = []
+            for gap in sorted(gaps, key=width, reverse=True):
+                gap_markers = []
+                if budget > 0:
+                    gap_markers = _probe_markers(gap[0], gap[1], prefix,
+                                                 min(count, budget))
+                    if not gap_markers:
+                        # too close together to split
+                        continue
+                budget -= len(gap_markers)
+                if gap_markers:
+                    probing.append((gap[0], gap[2], gap_markers))
+                else:
+                    waiting.append(gap)
+            flat = [marker for low, high, gap_markers in probing
+                    for marker in gap_markers]
+            probes += len(flat)
+            results = dict(zip(flat, self._map(probe, flat, concurrency)))
+            gaps = waiting
+            for low, high, gap_markers in probing:
+                names = set([low])
+                for marker in gap_markers:
+                    item = results[marker]
+                    if item and (high is None or item['name'] < high):
+                        found[item['name']] = item
+                        names.add(item['name'])
+                names = sorted(names) + [high]
+                for low, high in zip(names, names[1:]):
+                    limit = high
+                    for marker in gap_markers:
+                        if marker <= low or \
+                                high is not None and marker >= high:
+                            continue
+                        item = results[marker]
+                        if item is None or high is not None and \
+                                item['name'] >= high:
+                            # nothing between the marker and high
+                            limit = marker
+                            break
+                    gaps.append((low, limit, high))
+        return [found[name] for name in sorted(found)]
+
+    def _iter_ranges(self, container, marker, prefix, end_marker, page_size,
+                     concurrency):
+        # Names are compared with those in listings, which are unicode.
+        prefix, marker, end_marker = [
+            value.decode('utf8') if isinstance(value, str) else value
+            for value in (prefix or u'', marker or u'', end_marker)]
+        # a page shorter than the limit asked for is the last of its
+        # listing (the cluster refuses a limit above its own rather than
+        # listing fewer), so that limit is needed to know where ranges end
+        page_size = page_size or self._container_listing_limit()
+        if not page_size:
+            for item in self._iter_listing(get_container, (container,),
+                                           marker, True, prefix=prefix,
+                                           end_marker=end_marker):
+                yield item
+            return
+        lister = self.clone()
+        try:
+            headers, page = lister._retry(None, get_container, container,
+                                          marker=marker, prefix=prefix,
+                                          end_marker=end_marker,
+                                          limit=page_size)
+        finally:
+            lister.close()
+        for item in page:
+            yield item
+        if len(page) < page_size:
+            return
+        # the object count covers the whole container, so it overestimates
+        # what is left with a prefix or end_marker, but never underestimates
+        remaining = int(headers.get('x-container-object-count', 0)) - \
+            len(page)
+        if remaining <= 0:
+            return
+        lo = page[-1]['name']
+        pages = (remaining + page_size - 1) // page_size
+        # one range per thread; each ends with a short page, and finding its
+        # bounds takes a probe or two each
+        wanted = min(pages, concurrency) - 1
+        if wanted < 1:
+            bounds = []
+        else:
+            bounds = self._sample_names(container, lo, prefix, end_marker,
+                                        wanted, 2 * wanted, concurrency)
+        names = [item['name'] for item in bounds]
+        ranges = zip([lo] + names, names + [end_marker])
+        # a few pages buffered per range, so at most concurrency ranges
+        # ahead of the caller are held in memory
+        queues = [Queue(4) for _ in ranges]
+        todo = iter(xrange(len(ranges)))
+        lock = Lock()
+        stopped = []
+
+        def work():
+            conn = self.clone()
+            try:
+                while not stopped:
+                    with lock:
+                        i = next(todo, None)
+                    if i is None:
+                        return
+                    lo, hi = ranges[i]
+                    try:
+                        while not stopped:
+                            page = conn._retry(None, get_container,
+                                               container, marker=lo,
+                                               prefix=prefix, end_marker=hi,
+                                               limit=page_size)[1]
+                            if page:
+                                queues[i].put(page)
+                                lo = page[-1]['name']
+                            if len(page) < page_size:
+                                break
+                    except Exception:
+                        queues[i].put(sys.exc_info())
+                    queues[i].put(None)
+            finally:
+                conn.close()
+                if conn.token and conn.token != self.token:
+                    self.url, self.token = conn.url, conn.token
+
+        threads = [Thread(target=work)
+                   for _ in xrange(min(concurrency, len(ranges)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for i, queue in enumerate(queues):
+                page = queue.get()
+                while page is not None:
+                    if isinstance(page, tuple):
+                        raise page[0], page[1], page[2]
+                    for item in page:
+                        yield item
+                    page = queue.get()
+                if i < len(bounds):
+                    yield bounds[i]
+        finally:
+            stopped.append(True)
+            for thread in threads:
+                while thread.is_alive():
+                    # unblock it if it is waiting for room in a queue
+                    for queue in queues:
+                        try:
+                            queue.get_nowait()
+                        except Empty:
+                            pass
+                    thread.join(0.01)
+
     def post_account(self, headers):
         """Wrapper for :func:`post_account`"""
         return self._retry(None, post_account, headers)
@@ -1069,10 +2852,27 @@ class Connection(object):
     def get_container(self, container, marker=None, limit=None, prefix=None,
                       delimiter=None, end_marker=None, path=None,
                       full_listing=False):
-        """Wrapper for :func:`get_container`"""
-        # TODO(unknown): With full_listing=True this will restart the entire
-        # listing with each retry. Need to make a better version that just
-        # retries where it left off.
+        """
+        Wrapper for :func:`get_container`
+
+        With full_listing=True a retry restarts the entire listing, and all
+        of it is kept in memory; :meth:`iter_container` does neither. It is
+        answered from the listing_cache, as :meth:`iter_container` is, when
+        there is no limit, delimiter or path; the headers returned are then
+        those of the HEAD.
+        """
+        if full_listing and self.listing_cache is not None and \
+                not (limit or delimiter or path):
+            headers = self.head_container(container)
+
+            def live(marker, prefix, end_marker):
+                return self._retry(None, get_container, container,
+                                   marker=marker, prefix=prefix,
+                                   end_marker=end_marker,
+                                   full_listing=True)[1]
+            return headers, list(self._iter_cached(container, headers,
+                                                   marker, prefix,
+                                                   end_marker, live))
         return self._retry(None, get_container, container, marker=marker,
                            limit=limit, prefix=prefix, delimiter=delimiter,
                            end_marker=end_marker, path=path,
@@ -1088,22 +2888,301 @@ class Connection(object):
 
     def delete_container(self, container):
         """Wrapper for :func:`delete_container`"""
-        return self._retry(None, delete_container, container)
+        try:
+            return self._retry(None, delete_container, container)
+        finally:
+            self._changed(container)
 
     def head_object(self, container, obj):
         """Wrapper for :func:`head_object`"""
         return self._retry(None, head_object, container, obj)
 
     def get_object(self, container, obj, resp_chunk_size=None,
-                   query_string=None):
+                   query_string=None, resp_buffer=None, headers=None):
         """Wrapper for :func:`get_object`"""
         return self._retry(None, get_object, container, obj,
                            resp_chunk_size=resp_chunk_size,
-                           query_string=query_string)
+                           query_string=query_string,
+                           min_throughput=self.min_throughput,
+                           resp_buffer=resp_buffer,
+                           max_body_size=self.max_body_size,
+                           chunk_sizer=self.chunk_sizer, headers=headers,
+                           rate_limiter=self.download_limiter)
+
+    def download_object(self, container, obj, path, range_size=67108864,
+                        concurrency=None, resume=False):
+        """
+        Download an object into a file, fetching the byte ranges of a large
+        object in parallel.
+
+        The first range_size bytes are requested first. If the object turns
+        out to be larger and is not a manifest, the rest is requested in
+        ranges of range_size bytes by up to concurrency threads, each with a
+        clone of this connection, and written in place into the file. Each
+        range is requested with If-Match on the ETag of the first response,
+        so a change to the object part way through fails with a 412 rather
+        than mixing two versions. As the ranges complete the file is read
+        back in order to check its MD5 against that ETag.
+
+        The segments of a manifest (listed from the manifest of a static
+        large object, or from the prefix of a dynamic one) are instead
+        fetched directly, up to concurrency at once, and each is checked
+        against its own ETag as it is written. Segments the first response
+        already covered are only read back and checked.
+
+        Until the download is complete the object's ETag is kept in a file
+        beside path, named as path with .swift-etag appended. With resume,
+        a file already at path is taken to hold the start of the object if
+        a HEAD finds the same ETag as that file, and only the rest is
+        requested. A file of the object's full length is kept only if it
+        checks out: against the ETag, or a manifest's segment by segment
+        against theirs; a manifest whose segments cannot be listed is
+        downloaded again unless the file came from it. The part already
+        there is hashed along with the rest, and if the MD5 does not match
+        the object is downloaded again from scratch.
+
+        :param container: container name that the object is in
+        :param obj: object name to get
+        :param path: file to write the object to; created or truncated
+        :param range_size: bytes to request at a time
+        :param concurrency: most ranges fetched at once; by default
+                            download_concurrency
+        :param resume: carry on from the contents of an existing file
+        :returns: a tuple of (response headers, bytes written), where the
+                  headers are those of the whole object
+        :raises ClientException: a request failed, or the MD5 of the file
+                                 does not match the object's ETag
+        """
+        if concurrency is None:
+            concurrency = self.download_concurrency
+        offset = 0
+        if resume and os.path.isfile(path):
+            headers = self.head_object(container, obj)
+            offset = _resume_offset(path, headers)
+        if not offset:
+            try:
+                headers, body = self.get_object(
+                    container, obj, resp_chunk_size=65536,
+                    headers={'Range': 'bytes=0-%d' % (range_size - 1)})
+            except ClientException as err:
+                if err.http_status != 416:
+                    raise
+                # an empty object has no ranges to satisfy
+                headers, body = self.get_object(container, obj,
+                                                resp_chunk_size=65536)
+        etag = headers.get('etag', '').strip('"')
+        if not offset and etag:
+            with open(_etag_record(path), 'w') as fp:
+                fp.write(etag)
+        md5sum = None
+        if etag and 'x-object-manifest' not in headers and \
+                'x-static-large-object' not in headers:
+            md5sum = md5()
+        finished = {}
+        hashed = [0]
+        hash_lock = Lock()
+
+        def _write(fd, offset, body):
+            for chunk in body:
+                os.lseek(fd, offset, os.SEEK_SET)
+                while chunk:
+                    written = os.write(fd, chunk)
+                    chunk = chunk[written:]
+                    offset += written
+            return offset
+
+        def _completed(start, end):
+            # hash the file in order, as far as the ranges finished allow,
+            # while the data is likely still in the page cache; only one
+            # thread hashes at a time, and the others leave it to it
+            finished[start] = end
+            while md5sum:
+                if not hash_lock.acquire(False):
+                    return
+                try:
+                    with open(path, 'rb') as fp:
+                        while hashed[0] in finished:
+                            fp.seek(hashed[0])
+                            end = finished.pop(hashed[0])
+                            while hashed[0] < end:
+                                chunk = fp.read(min(65536, end - hashed[0]))
+                                if not chunk:
+                                    raise ClientException(
+                                        'Downloaded file %s is truncated'
+                                        % path)
+                                md5sum.update(chunk)
+                                hashed[0] += len(chunk)
+                finally:
+                    hash_lock.release()
+                if hashed[0] not in finished:
+                    return
+
+        def _fetch(conn, byte_range):
+            # a range cut short is requested again from where it stopped
+            start, end = byte_range
+            fd = os.open(path, os.O_WRONLY)
+            try:
+                offset = start
+                failures = 0
+                while offset < end:
+                    range_headers = {'Range': 'bytes=%d-%d' % (offset,
+                                                               end - 1)}
+                    if md5sum:
+                        range_headers['If-Match'] = '"%s"' % etag
+                    try:
+                        range_headers, body = conn.get_object(
+                            container, obj, resp_chunk_size=65536,
+                            headers=range_headers)
+                        if 'content-range' not in range_headers:
+                            raise ClientException(
+                                'Object GET ignored the Range header',
+                                http_path='%s/%s' % (container, obj))
+                        offset = _write(fd, offset, body)
+                    except (socket.error, HTTPException):
+                        conn._discard_http_conn()
+                        if failures >= conn.retries:
+                            raise
+                    if offset < end:
+                        failures += 1
+                        if failures > conn.retries:
+                            raise ClientException(
+                                'Object GET returned too few bytes',
+                                http_path='%s/%s' % (container, obj))
+            finally:
+                os.close(fd)
+            _completed(start, end)
+
+        def _hashed(body, segment_md5):
+            for chunk in body:
+                segment_md5.update(chunk)
+                yield chunk
+
+        def _file_md5(start, size):
+            segment_md5 = md5()
+            with open(path, 'rb') as fp:
+                fp.seek(start)
+                while size > 0:
+                    chunk = fp.read(min(65536, size))
+                    if not chunk:
+                        break
+                    segment_md5.update(chunk)
+                    size -= len(chunk)
+            return segment_md5.hexdigest()
+
+        def _fetch_segment(conn, segment):
+            start, seg_container, seg_obj, size, seg_etag = segment
+            if start + size <= length and _file_md5(start, size) == seg_etag:
+                return
+            fd = os.open(path, os.O_WRONLY)
+            try:
+                failures = 0
+                while True:
+                    segment_md5 = md5()
+                    end = None
+                    try:
+                        _junk, body = conn.get_object(
+                            seg_container, seg_obj, resp_chunk_size=65536,
+                            headers={'If-Match': '"%s"' % seg_etag})
+                        end = _write(fd, start, _hashed(body, segment_md5))
+                    except (socket.error, HTTPException):
+                        conn._discard_http_conn()
+                    if end == start + size and \
+                            segment_md5.hexdigest() == seg_etag:
+                        return
+                    failures += 1
+                    if failures > conn.retries:
+                        raise ClientException(
+                            'Segment GET failed: contents do not match the '
+                            'manifest', http_path='%s/%s' % (seg_container,
+                                                             seg_obj))
+            finally:
+                os.close(fd)
+
+        content_range = headers.pop('content-range', None)
+        if offset:
+            fd = os.open(path, os.O_WRONLY)
+        else:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+        try:
+            if offset:
+                length = offset
+                total = int(headers['content-length'])
+            else:
+                length = _write(fd, 0, body)
+                total = length
+                if content_range:
+                    total = int(content_range.rsplit('/', 1)[1])
+            os.ftruncate(fd, total)
+        finally:
+            os.close(fd)
+        _completed(0, length)
+        segments = None
+        if 'x-object-manifest' in headers or \
+                'x-static-large-object' in headers:
+            segments = self._manifest_segments(container, obj, headers)
+            if segments is not None and \
+                    sum(segment[2] for segment in segments) != total:
+                # the segment listing is not up to date
+                segments = None
+            if offset and segments is None and \
+                    _recorded_etag(path) != etag:
+                # nothing to check what is there already against
+                return self.download_object(container, obj, path,
+                                            range_size, concurrency)
+        ranges = [(start, min(start + range_size, total))
+                  for start in xrange(length, total, range_size)]
+        if segments is not None:
+            jobs = []
+            start = 0
+            for segment in segments:
+                jobs.append((start,) + segment)
+                start += segment[2]
+            self._map(_fetch_segment, jobs, concurrency)
+        elif ranges:
+            if md5sum is None:
+                # without an ETag to guard the ranges with (a manifest's is
+                # not the MD5 of its contents) the rest is read in one go
+                ranges = [(length, total)]
+            self._map(_fetch, ranges, concurrency)
+        if md5sum and md5sum.hexdigest() != etag and offset:
+            # what was there already was not the start of this object
+            return self.download_object(container, obj, path, range_size,
+                                        concurrency)
+        if md5sum and md5sum.hexdigest() != etag:
+            raise ClientException(
+                'md5sum != etag, %s != %s' % (md5sum.hexdigest(), etag),
+                http_path='%s/%s' % (container, obj))
+        try:
+            os.unlink(_etag_record(path))
+        except OSError:
+            pass
+        headers['content-length'] = str(total)
+        return headers, total
+
+    def _manifest_segments(self, container, obj, headers):
+        # [(container, object, bytes, etag)] of a manifest's segments in
+        # order, or None if they can't each be fetched as a whole object
+        if 'x-static-large-object' in headers:
+            manifest = json_loads(self.get_object(
+                container, obj, query_string='multipart-manifest=get')[1])
+            segments = []
+            for segment in manifest:
+                if segment.get('sub_slo') or 'range' in segment:
+                    return None
+                seg_container, seg_obj = \
+                    segment['name'].lstrip('/').split('/', 1)
+                segments.append((seg_container, seg_obj, segment['bytes'],
+                                 segment['hash']))
+            return segments
+        seg_container, prefix = \
+            unquote(headers['x-object-manifest']).split('/', 1)
+        return [(seg_container, item['name'], item['bytes'], item['hash'])
+                for item in self.iter_container(seg_container, prefix=prefix)]
 
     def put_object(self, container, obj, contents, content_length=None,
                    etag=None, chunk_size=None, content_type=None,
-                   headers=None, query_string=None):
+                   headers=None, query_string=None, response_dict=None,
+                   checksum=False):
         """Wrapper for :func:`put_object`"""
 
         def _default_reset(*args, **kwargs):
@@ -1124,16 +3203,79 @@ class Connection(object):
         elif not contents:
             reset_func = lambda *a, **k: None
 
-        return self._retry(reset_func, put_object, container, obj, contents,
-                           content_length=content_length, etag=etag,
-                           chunk_size=chunk_size, content_type=content_type,
-                           headers=headers, query_string=query_string)
+        try:
+            return self._retry(reset_func, put_object, container, obj,
+                               contents, content_length=content_length,
+                               etag=etag, chunk_size=chunk_size,
+                               content_type=content_type, headers=headers,
+                               query_string=query_string,
+                               min_throughput=self.min_throughput,
+                               chunk_sizer=self.chunk_sizer,
+                               response_dict=response_dict,
+                               checksum=checksum,
+                               rate_limiter=self.upload_limiter)
+        finally:
+            self._changed(container)
 
     def post_object(self, container, obj, headers):
         """Wrapper for :func:`post_object`"""
-        return self._retry(None, post_object, container, obj, headers)
+        try:
+            return self._retry(None, post_object, container, obj, headers)
+        finally:
+            self._changed(container)
 
     def delete_object(self, container, obj, query_string=None):
         """Wrapper for :func:`delete_object`"""
-        return self._retry(None, delete_object, container, obj,
-                           query_string=query_string)
+        try:
+            return self._retry(None, delete_object, container, obj,
+                               query_string=query_string)
+        finally:
+            self._changed(container)
+
+    def get_capabilities(self):
+        """Wrapper for :func:`get_capabilities`"""
+        return self._retry(None, get_capabilities)
+
+    def bulk_delete(self, paths, batch_size=None):
+        """
+        Delete objects (and empty containers) using the cluster's bulk delete
+        middleware, batch_size paths per request.
+
+        :param paths: iterable of 'container/object' (or 'container') names
+        :param batch_size: most paths to send per request; by default the
+                           max_deletes_per_request the cluster reports, or
+                           10000 if it does not say
+        :returns: a dict with the total numbers of paths 'deleted' and
+                  'not_found', and 'errors', a list of (path, status) for the
+                  paths that could not be deleted
+        :raises ClientException: a request failed, or the cluster does not
+                                 support bulk delete
+        """
+        if batch_size is None:
+            batch_size = 10000
+            try:
+                info = self.get_capabilities()
+            except ClientException as err:
+                if err.http_status != 404:
+                    raise
+            else:
+                if 'bulk_delete' not in info:
+                    raise ClientException('Bulk delete not supported')
+                batch_size = info['bulk_delete'].get(
+                    'max_deletes_per_request', batch_size)
+        totals = {'deleted': 0, 'not_found': 0, 'errors': []}
+        paths = iter(paths)
+        while True:
+            batch = list(islice(paths, batch_size))
+            if not batch:
+                break
+            try:
+                result = self._retry(None, bulk_delete, batch)
+            finally:
+                for container in set(path.lstrip('/').split('/', 1)[0]
+                                     for path in batch):
+                    self._changed(container)
+            totals['deleted'] += result['deleted']
+            totals['not_found'] += result['not_found']
+            totals['errors'].extend(result['errors'])
+        return totals
@@ -0,0 +1,292 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cooperative (eventlet) counterpart of :class:`swiftclient.client.Connection`.
+
+This needs eventlet. The client module is imported a second time with green
+sockets, ssl, select, threading and time, so its operations yield to other
+greenthreads instead of blocking the process; thousands of them can be in
+flight without an OS thread each.
+"""
+
+import sys
+
+import swiftclient
+from swiftclient import client
+
+from swiftclient.client import ClientException
+
+try:
+    import eventlet
+    from eventlet.event import Event
+    from eventlet.green import httplib
+    from eventlet.queue import Queue
+    from eventlet.semaphore import Semaphore
+except ImportError:
+    eventlet = None
+
+if eventlet is not None:
+    green = eventlet.import_patched('swiftclient.client', httplib=httplib)
+    # importing it again rebinds the package attribute to the green copy
+    swiftclient.client = client
+    # so callers catch the same exception whichever client they use
+    green.ClientException = ClientException
+else:
+    green = None
+
+
+class BodyQueue(object):
+    """
+    Upload body fed by another greenthread.
+
+    Pass it as the contents of :meth:`AsyncConnection.put_object` (which then
+    uses chunked transfer encoding unless given a content_length) and
+    :meth:`write` the data to it as it is produced, then call :meth:`finish`.
+    It cannot be rewound, so a failed upload is not retried.
+    """
+
+    def __init__(self, maxsize=16):
+        """
+        :param maxsize: most pending writes before :meth:`write` waits for
+                        the upload to catch up
+        """
+        if eventlet is None:
+            raise ClientException('BodyQueue requires eventlet')
+        self._queue = Queue(maxsize)
+        self._buf = ''
+        self._done = False
+
+    def write(self, data):
+        """Queue data to be uploaded."""
+        if data:
+            self._queue.put(data)
+
+    def finish(self):
+        """Mark the end of the body."""
+        self._queue.put(None)
+
+    def read(self, size=-1):
+        """
+        Return up to size bytes of the body (all of it if size is negative),
+        waiting for them to be written; '' at the end.
+        """
+        while not self._done and (size < 0 or len(self._buf) < size):
+            data = self._queue.get()
+            if data is None:
+                self._done = True
+            else:
+                self._buf += data
+                if size >= 0:
+                    break
+        if size < 0:
+            size = len(self._buf)
+        data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+
+def _release_after(body, release):
+    try:
+        for chunk in body:
+            yield chunk
+    finally:
+        release()
+
+
+class AsyncConnection(object):
+    """
+    Run :class:`~swiftclient.client.Connection` operations in greenthreads.
+
+    Every Connection operation is available with the same arguments. It is
+    started in a greenthread and an eventlet Event is returned right away;
+    its ``wait()`` returns the operation's result or raises its exception.
+
+    Each running operation has a green Connection to itself, so retries,
+    reauthentication after a 401 and resetting the contents of an upload
+    before retrying it all work as they do for Connection. Idle Connections
+    are kept for reuse, and their HTTP connections are pooled. Streamed
+    object downloads (resp_chunk_size or resp_buffer given) and the
+    generators of iter_account and iter_container hold on to their
+    Connection until they have been read to the end.
+    """
+
+    def __init__(self, authurl=None, user=None, key=None, concurrency=1000,
+                 **kwargs):
+        """
+        :param authurl: authentication URL
+        :param user: user name to authenticate as
+        :param key: key/password to authenticate with
+        :param concurrency: most operations to run at once; the rest wait
+                            for a free slot
+        :param kwargs: any other :class:`~swiftclient.client.Connection`
+                       argument. If pool is not given, the HTTP connections
+                       of all operations are pooled together. endpoints has
+                       to be a list of urls, not an EndpointSelector.
+        """
+        if eventlet is None:
+            raise ClientException('AsyncConnection requires eventlet')
+        self.authurl = authurl
+        self.user = user
+        self.key = key
+        self.url = kwargs.pop('preauthurl', None)
+        self.token = kwargs.pop('preauthtoken', None)
+        if kwargs.get('pool') is None:
+            kwargs['pool'] = green.ConnectionPool(max_per_host=concurrency)
+        self.pool = kwargs['pool']
+        self.kwargs = kwargs
+        self.greenpool = eventlet.GreenPool(concurrency)
+        self._auth_lock = Semaphore()
+        self._idle = []
+
+    def _get_conn(self):
+        if self._idle:
+            conn = self._idle.pop()
+        else:
+            conn = green.Connection(self.authurl, self.user, self.key,
+                                    **self.kwargs)
+        if self.token is None and self.authurl:
+            # authenticate once for all the operations starting together
+            with self._auth_lock:
+                if self.token is None:
+                    self.url, self.token = conn.get_auth()
+        if self.token != conn.token:
+            conn.url, conn.token = self.url, self.token
+        return conn
+
+    def _put_conn(self, conn):
+        if conn.token and conn.token != self.token:
+            self.url, self.token = conn.url, conn.token
+        conn.close()
+        self._idle.append(conn)
+
+    def _run(self, result, func, args):
+        # hand any error to the waiter; raising it here would only make the
+        # hub print it
+        try:
+            result.send(func(*args))
+        except Exception:
+            result.send_exception(*sys.exc_info())
+
+    def _operation(self, name, args, kwargs):
+        conn = self._get_conn()
+        try:
+            rv = getattr(conn, name)(*args, **kwargs)
+        except Exception:
+            self._put_conn(conn)
+            raise
+        if name in ('iter_account', 'iter_container'):
+            return _release_after(rv, lambda: self._put_conn(conn))
+        if name == 'get_object' and (kwargs.get('resp_chunk_size') or
+                                     kwargs.get('resp_buffer')):
+            headers, body = rv
+            return headers, _release_after(body,
+                                           lambda: self._put_conn(conn))
+        self._put_conn(conn)
+        return rv
+
+    def _spawn(self, func, *args):
+        result = Event()
+        self.greenpool.spawn_n(self._run, result, func, args)
+        return result
+
+    def _start(self, name, *args, **kwargs):
+        return self._spawn(self._operation, name, args, kwargs)
+
+    def waitall(self):
+        """Wait for every running operation to finish."""
+        self.greenpool.waitall()
+
+    def close(self):
+        """Close the idle HTTP connections."""
+        del self._idle[:]
+        self.pool.close()
+
+    def get_auth(self):
+        """Start :meth:`Connection.get_auth`"""
+        conn = green.Connection(self.authurl, self.user, self.key,
+                                **self.kwargs)
+        return self._spawn(conn.get_auth)
+
+    def head_account(self, *args, **kwargs):
+        """Start :meth:`Connection.head_account`"""
+        return self._start('head_account', *args, **kwargs)
+
+    def get_account(self, *args, **kwargs):
+        """Start :meth:`Connection.get_account`"""
+        return self._start('get_account', *args, **kwargs)
+
+    def iter_account(self, *args, **kwargs):
+        """Start :meth:`Connection.iter_account`"""
+        return self._start('iter_account', *args, **kwargs)
+
+    def post_account(self, *args, **kwargs):
+        """Start :meth:`Connection.post_account`"""
+        return self._start('post_account', *args, **kwargs)
+
+    def head_container(self, *args, **kwargs):
+        """Start :meth:`Connection.head_container`"""
+        return self._start('head_container', *args, **kwargs)
+
+    def get_container(self, *args, **kwargs):
+        """Start :meth:`Connection.get_container`"""
+        return self._start('get_container', *args, **kwargs)
+
+    def iter_container(self, *args, **kwargs):
+        """Start :meth:`Connection.iter_container`"""
+        return self._start('iter_container', *args, **kwargs)
+
+    def put_container(self, *args, **kwargs):
+        """Start :meth:`Connection.put_container`"""
+        return self._start('put_container', *args, **kwargs)
+
+    def post_container(self, *args, **kwargs):
+        """Start :meth:`Connection.post_container`"""
+        return self._start('post_container', *args, **kwargs)
+
+    def delete_container(self, *args, **kwargs):
+        """Start :meth:`Connection.delete_container`"""
+        return self._start('delete_container', *args, **kwargs)
+
+    def head_object(self, *args, **kwargs):
+        """Start :meth:`Connection.head_object`"""
+        return self._start('head_object', *args, **kwargs)
+
+    def get_object(self, *args, **kwargs):
+        """Start :meth:`Connection.get_object`"""
+        return self._start('get_object', *args, **kwargs)
+
+    def download_object(self, *args, **kwargs):
+        """Start :meth:`Connection.download_object`"""
+        return self._start('download_object', *args, **kwargs)
+
+    def put_object(self, *args, **kwargs):
+        """Start :meth:`Connection.put_object`"""
+        return self._start('put_object', *args, **kwargs)
+
+    def post_object(self, *args, **kwargs):
+        """Start :meth:`Connection.post_object`"""
+        return self._start('post_object', *args, **kwargs)
+
+    def delete_object(self, *args, **kwargs):
+        """Start :meth:`Connection.delete_object`"""
+        return self._start('delete_object', *args, **kwargs)
+
+    def get_capabilities(self, *args, **kwargs):
+        """Start :meth:`Connection.get_capabilities`"""
+        return self._start('get_capabilities', *args, **kwargs)
+
+    def bulk_delete(self, *args, **kwargs):
+        """Start :meth:`Connection.bulk_delete`"""
+        return self._start('bulk_delete', *args, **kwargs)
@@ -0,0 +1,106 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Journal of the work a long running job has finished, so that after it is
+interrupted it can be run again skipping that work without asking the
+cluster about it.
+"""
+
+from threading import Lock
+from time import time
+
+from swiftclient.client import ClientException
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+
+def _key(key):
+    # kept as bytes, as local file names need not be valid UTF-8
+    return buffer('\0'.join(part.encode('utf8') if isinstance(part, unicode)
+                            else str(part) for part in key))
+
+
+class Journal(object):
+    """
+    SQLite file recording finished pieces of work, each under a key (a
+    tuple of strings) with an optional value such as an etag.
+
+    It can be shared by threads. Records are committed in batches, so a
+    crash loses at most the last commit_interval seconds of them; redoing
+    that work is harmless.
+    """
+
+    def __init__(self, path, commit_interval=1.0, commit_every=1000):
+        """
+        :param path: journal file; created if it does not exist, otherwise
+                     added to
+        :param commit_interval: most seconds a record waits to be committed
+        :param commit_every: most records waiting to be committed
+        """
+        if sqlite3 is None:
+            raise ClientException('Journal requires sqlite3')
+        self.path = path
+        self.commit_interval = commit_interval
+        self.commit_every = commit_every
+        self._lock = Lock()
+        self._pending = 0
+        self._committed = time()
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS done ('
+                             'key BLOB PRIMARY KEY, value TEXT)')
+
+    def get(self, key):
+        """
+        Return the value recorded for key, or None if it is not recorded.
+        """
+        with self._lock:
+            row = self._db.execute('SELECT value FROM done WHERE key = ?',
+                                   (_key(key),)).fetchone()
+        return row and row[0]
+
+    def done(self, key):
+        """Return whether key has been recorded."""
+        return self.get(key) is not None
+
+    def record(self, key, value=''):
+        """Record that the work under key has been finished."""
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO done (key, value) '
+                             'VALUES (?, ?)', (_key(key), value or ''))
+            self._pending += 1
+            if self._pending >= self.commit_every or \
+                    time() - self._committed >= self.commit_interval:
+                self._commit()
+
+    def _commit(self):
+        self._db.commit()
+        self._pending = 0
+        self._committed = time()
+
+    def flush(self):
+        """Commit every record made so far."""
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        """Commit every record made so far and close the file."""
+        with self._lock:
+            self._commit()
+            self._db.close()
@@ -0,0 +1,292 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pools of threads working through a queue of items.
+
+Idle threads block on the queue rather than polling it, and are stopped by
+a sentinel queued after the work. Waits that may happen in the main thread
+are made in short timed steps, as on Python 2 an untimed wait can't be
+interrupted by a signal such as the one Ctrl-C sends.
+"""
+
+import sys
+from Queue import Queue
+from threading import Condition, Event, Lock, Thread
+from time import time
+
+from swiftclient.client import ClientException
+
+# longest single wait made where the main thread may be the one waiting
+WAIT_INTERVAL = 1.0
+
+_STOP = object()
+
+
+def _wait(event, timeout=None):
+    deadline = None
+    if timeout is not None:
+        deadline = time() + timeout
+    while not event.is_set():
+        step = WAIT_INTERVAL
+        if deadline is not None:
+            step = min(step, deadline - time())
+            if step <= 0:
+                return False
+        event.wait(step)
+    return True
+
+
+class Future(object):
+    """
+    The outcome of an item submitted to an :class:`Executor`.
+    """
+
+    def __init__(self):
+        self._event = Event()
+        self._result = None
+        self._exc_info = None
+        self._cancelled = False
+
+    def done(self):
+        """Return whether the item has been dealt with or cancelled."""
+        return self._event.is_set()
+
+    def cancelled(self):
+        """Return whether the item was dropped without being dealt with."""
+        return self._cancelled
+
+    def result(self, timeout=None):
+        """
+        Wait for the item to be dealt with and return what the function
+        returned for it, raising what it raised instead if anything.
+
+        :param timeout: most seconds to wait; by default no limit
+        :raises ClientException: the item was cancelled, or timeout passed
+        """
+        if not _wait(self._event, timeout):
+            raise ClientException('Timed out waiting for a result')
+        if self._cancelled:
+            raise ClientException('Cancelled before it was started')
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        """
+        Wait for the item to be dealt with and return the exception the
+        function raised for it, or None.
+        """
+        if not _wait(self._event, timeout):
+            raise ClientException('Timed out waiting for a result')
+        return self._exc_info and self._exc_info[1]
+
+    def exception_info(self, timeout=None):
+        """
+        As :meth:`exception`, but return the whole exc_info tuple, traceback
+        included, or None.
+        """
+        if not _wait(self._event, timeout):
+            raise ClientException('Timed out waiting for a result')
+        return self._exc_info
+
+    def _set_result(self, result):
+        self._result = result
+        self._event.set()
+
+    def _set_exc_info(self, exc_info):
+        self._exc_info = exc_info
+        self._event.set()
+
+    def _cancel(self):
+        self._cancelled = True
+        self._event.set()
+
+
+class _Worker(Thread):
+
+    def __init__(self, executor):
+        Thread.__init__(self)
+        self.executor = executor
+
+    # attempt_graceful_exit in bin/swift sets abort on every thread
+    @property
+    def abort(self):
+        return self.executor.cancelled
+
+    @abort.setter
+    def abort(self, value):
+        if value:
+            self.executor.cancel()
+
+    def run(self):
+        self.executor._work()
+
+
+class Executor(object):
+    """
+    Threads calling a function on each item submitted, in the order
+    submitted.
+
+    An Executor can be used as a context manager, which shuts it down on
+    exit.
+    """
+
+    def __init__(self, func, workers=1, make_args=None, maxsize=10000,
+                 controller=None):
+        """
+        :param func: called as func(item, \\*args) for each item
+        :param workers: number of threads
+        :param make_args: called by each thread as it starts to make the
+                          tuple of args it passes to func, such as a
+                          connection of its own; those with a close method
+                          are closed when the thread stops
+        :param maxsize: most items waiting to be dealt with; submitting more
+                        blocks until there is room
+        :param controller: a
+                           :class:`swiftclient.client.ConcurrencyController`,
+                           or anything with acquire and release methods,
+                           that threads hold while calling func, so that
+                           workers is only a ceiling on how many do at once
+        """
+        self.func = func
+        self.make_args = make_args
+        self.controller = controller
+        self.cancelled = False
+        self.exc_infos = []
+        self._queue = Queue()
+        self._maxsize = maxsize
+        self._waiting = 0
+        self._room = Condition(Lock())
+        self._lock = Lock()
+        self._unfinished = 0
+        self._idle = Event()
+        self._idle.set()
+        self._threads = [_Worker(self) for _junk in xrange(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is not None:
+            self.cancel()
+        self.shutdown()
+
+    def submit(self, item):
+        """
+        Queue item to have func called on it.
+
+        :returns: :class:`Future` of the call; already cancelled if the
+                  Executor has been
+        """
+        future = Future()
+        if self._maxsize:
+            with self._room:
+                while self._waiting >= self._maxsize and not self.cancelled:
+                    self._room.wait(WAIT_INTERVAL)
+                if not self.cancelled:
+                    self._waiting += 1
+        if self.cancelled:
+            future._cancel()
+            return future
+        with self._lock:
+            self._unfinished += 1
+            self._idle.clear()
+        self._queue.put((future, item))
+        return future
+
+    # for code written against a Queue
+    put = submit
+
+    def join(self):
+        """Wait until every item submitted so far has been dealt with."""
+        _wait(self._idle)
+
+    def shutdown(self, wait=True):
+        """
+        Stop the threads once the items already submitted are dealt with.
+
+        :param wait: wait for the threads to stop
+        """
+        for _junk in self._threads:
+            self._queue.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                while thread.is_alive():
+                    thread.join(WAIT_INTERVAL)
+
+    def cancel(self):
+        """
+        Drop the items not yet started and stop the threads once they have
+        finished the ones in hand. Functions that take long can check the
+        cancelled attribute to give up early.
+        """
+        self.cancelled = True
+        with self._room:
+            self._room.notify_all()
+        for _junk in self._threads:
+            self._queue.put(_STOP)
+
+    def _work(self):
+        args = ()
+        failure = None
+        if self.make_args:
+            try:
+                args = self.make_args()
+            except Exception:
+                # the items this thread takes fail the same way
+                failure = sys.exc_info()
+                self.exc_infos.append(failure)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                future, item = item
+                if self._maxsize:
+                    with self._room:
+                        self._waiting -= 1
+                        self._room.notify()
+                try:
+                    if self.cancelled:
+                        future._cancel()
+                    elif failure:
+                        future._set_exc_info(failure)
+                    elif self.controller:
+                        self.controller.acquire()
+                        try:
+                            future._set_result(self.func(item, *args))
+                        finally:
+                            self.controller.release()
+                    else:
+                        future._set_result(self.func(item, *args))
+                except Exception:
+                    exc_info = sys.exc_info()
+                    self.exc_infos.append(exc_info)
+                    future._set_exc_info(exc_info)
+                finally:
+                    self._finished()
+        finally:
+            for arg in args:
+                if hasattr(arg, 'close'):
+                    arg.close()
+
+    def _finished(self):
+        with self._lock:
+            self._unfinished -= 1
+            if not self._unfinished:
+                self._idle.set()
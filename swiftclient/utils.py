@@ -15,6 +15,10 @@
 
 """Miscellaneous utility functions for use with Swift."""
 
+import os
+import tarfile
+from calendar import timegm
+
 TRUE_VALUES = set(('true', '1', 'yes', 'on', 't', 'y'))
 
 
@@ -26,3 +30,131 @@ def config_true_value(value):
     """
     return value is True or \
         (isinstance(value, basestring) and value.lower() in TRUE_VALUES)
+
+
+def parse_last_modified(value):
+    """
+    Return the last_modified of a container listing entry (e.g.
+    '2013-06-01T12:00:00.123450', in UTC) as seconds since the epoch, or
+    None if it can't be parsed.
+    """
+    # parsed by hand, as time.strptime is not safe to call from several
+    # threads at once on its first use
+    try:
+        seconds, _junk, fraction = value.partition('.')
+        date, _junk, time = seconds.partition('T')
+        fields = [int(f) for f in date.split('-') + time.split(':')]
+        if len(fields) != 6:
+            return None
+        return timegm(fields + [0, 0, 0]) + float('0.' + (fraction or '0'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def match_listing(names, listing):
+    """
+    Pair names with the entries of a container listing in a single pass
+    over both.
+
+    :param names: object names in listing order (i.e. sorted as UTF-8 byte
+                  strings)
+    :param listing: iterable of listing entries, as from
+                    :meth:`swiftclient.client.Connection.iter_container`
+    :returns: generator of (name, entry with that name or None) tuples, one
+              for each of names
+    """
+    listing = iter(listing)
+
+    def advance():
+        entry = next(listing, None)
+        if entry is None:
+            return None, None
+        return entry, entry['name'].encode('utf8')
+    entry, entry_name = advance()
+    for name in names:
+        key = name.encode('utf8') if isinstance(name, unicode) else name
+        while entry is not None and entry_name < key:
+            entry, entry_name = advance()
+        if entry is not None and entry_name == key:
+            yield name, entry
+        else:
+            yield name, None
+
+
+class TarStream(object):
+    """
+    File-like object reading as a tar archive of some local files.
+
+    The archive is produced as it is read, a file at a time, so it can be
+    uploaded (e.g. with extract-archive) without being written out first.
+    Its length is known up front, and it can be rewound with seek(0) to
+    upload it again. Members use the pax format, so their pax headers can
+    carry object metadata, e.g. SCHILY.xattr.user.meta.mtime.
+    """
+
+    def __init__(self, members, read_size=65536):
+        """
+        :param members: list of (local path, name in the archive, dict of pax
+                        headers) tuples
+        :param read_size: how much of a file to read at a time
+        """
+        self.read_size = read_size
+        self.members = []
+        self.size = 2 * tarfile.BLOCKSIZE
+        for path, name, pax_headers in members:
+            info = tarfile.TarInfo(name)
+            info.size = os.path.getsize(path)
+            info.mtime = int(os.path.getmtime(path))
+            info.mode = 0644
+            info.pax_headers = dict(pax_headers)
+            header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'strict')
+            self.members.append((header, path, info.size))
+            padding = -info.size % tarfile.BLOCKSIZE
+            self.size += len(header) + info.size + padding
+        self.seek(0)
+
+    def __len__(self):
+        return self.size
+
+    def _generate(self):
+        for header, path, size in self.members:
+            yield header
+            left = size
+            fp = open(path, 'rb')
+            try:
+                while left > 0:
+                    data = fp.read(min(left, self.read_size))
+                    if not data:
+                        # the file shrank since it was measured; keep the
+                        # archive consistent with its headers
+                        data = '\0' * left
+                    left -= len(data)
+                    yield data
+            finally:
+                fp.close()
+            yield '\0' * (-size % tarfile.BLOCKSIZE)
+        yield '\0' * (2 * tarfile.BLOCKSIZE)
+
+    def read(self, size=-1):
+        """Return up to size bytes of the archive (all of it if negative)."""
+        while size < 0 or len(self._buf) < size:
+            try:
+                self._buf += self._parts.next()
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buf)
+        data, self._buf = self._buf[:size], self._buf[size:]
+        self.pos += len(data)
+        return data
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, pos):
+        """Go back to the start of the archive; pos has to be 0."""
+        if pos != 0:
+            raise IOError('TarStream can only seek to the start')
+        self._parts = self._generate()
+        self._buf = ''
+        self.pos = 0
@@ -0,0 +1,193 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+
+import testtools
+
+from swiftclient import cache
+from swiftclient import client as c
+
+URL = 'http://www.test.com/v1/AUTH_a'
+HEADERS = {'x-container-object-count': '4',
+           'x-container-bytes-used': '40',
+           'x-timestamp': '1370000000.00000',
+           'x-put-timestamp': '1370000000.00000'}
+LISTING = [{'name': n, 'bytes': 10, 'hash': 'x'}
+           for n in (u'a/1', u'a/2', u'b', u'\u2603')]
+
+
+@testtools.skipIf(cache.sqlite3 is None, 'sqlite3 is not available')
+class TestListingCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestListingCache, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cache = cache.ListingCache(os.path.join(self.tmpdir, 'sub',
+                                                     'listings.sqlite'))
+
+    def test_default_path(self):
+        self.patch(os, 'environ', {'XDG_CACHE_HOME': '/x'})
+        self.assertEquals(cache.default_cache_path(),
+                          '/x/swiftclient/listings.sqlite')
+
+    def test_store_and_get(self):
+        self.assertEquals(self.cache.get(URL, 'c', HEADERS), None)
+        self.assertEquals(list(self.cache.store(URL, 'c', HEADERS, LISTING)),
+                          LISTING)
+        self.assertEquals(list(self.cache.get(URL, 'c', HEADERS)), LISTING)
+        self.assertEquals(self.cache.get(URL, 'other', HEADERS), None)
+        names = lambda **kwargs: [o['name'] for o in self.cache.get(
+            URL, 'c', HEADERS, **kwargs)]
+        self.assertEquals(names(prefix='a/'), ['a/1', 'a/2'])
+        self.assertEquals(names(marker='a/1'), ['a/2', 'b', u'\u2603'])
+        self.assertEquals(names(end_marker='b'), ['a/1', 'a/2'])
+        self.assertEquals(names(prefix='a', marker='a/1', end_marker='z'),
+                          ['a/2'])
+        self.assertEquals(names(prefix='\xe2\x98\x83'), [u'\u2603'])
+
+    def test_validation(self):
+        list(self.cache.store(URL, 'c', HEADERS, LISTING))
+        for header in cache.VALIDATOR_HEADERS:
+            changed = dict(HEADERS)
+            changed[header] = '5'
+            self.assertEquals(self.cache.get(URL, 'c', changed), None)
+        self.assertEquals(self.cache.get(URL, 'c', {}), None)
+        # a new listing replaces the old one
+        list(self.cache.store(URL, 'c', HEADERS, LISTING[:1]))
+        self.assertEquals(list(self.cache.get(URL, 'c', HEADERS)),
+                          LISTING[:1])
+
+    def test_incomplete_listing_not_saved(self):
+        listing = self.cache.store(URL, 'c', HEADERS, LISTING)
+        self.assertEquals(listing.next(), LISTING[0])
+        listing.close()
+        self.assertEquals(self.cache.get(URL, 'c', HEADERS), None)
+
+        def failing():
+            yield LISTING[0]
+            raise c.ClientException('Container GET failed')
+        self.assertRaises(c.ClientException, list,
+                          self.cache.store(URL, 'c', HEADERS, failing()))
+        self.assertEquals(self.cache.get(URL, 'c', HEADERS), None)
+
+    def test_invalidate(self):
+        list(self.cache.store(URL, 'c', HEADERS, LISTING))
+        self.cache.invalidate(URL, 'c')
+        self.assertEquals(self.cache.get(URL, 'c', HEADERS), None)
+        list(self.cache.store(URL, 'c', HEADERS, LISTING))
+        self.cache.invalidate(URL, 'c')
+        self.assertEquals(self.cache.get(URL, 'c', HEADERS), None)
+
+    def test_store_in_batches(self):
+        self.patch(cache, 'STORE_BATCH_SIZE', 2)
+        list(self.cache.store(URL, 'c', HEADERS, LISTING[:1]))
+        listing = self.cache.store(URL, 'c', HEADERS, LISTING)
+        self.assertEquals([listing.next() for _ in range(3)], LISTING[:3])
+        # the old listing is used until the new one is complete, and the
+        # database is not locked while the listing is consumed
+        self.assertEquals(list(self.cache.get(URL, 'c', HEADERS)),
+                          LISTING[:1])
+        self.cache.invalidate(URL, 'other')
+        self.assertEquals(list(listing), LISTING[3:])
+        self.assertEquals(list(self.cache.get(URL, 'c', HEADERS)), LISTING)
+        db = self.cache._connect()
+        self.assertEquals(db.execute('SELECT COUNT(*) FROM objects')
+                          .fetchone()[0], len(LISTING))
+        self.assertEquals(db.execute('SELECT COUNT(*) FROM containers')
+                          .fetchone()[0], 1)
+        db.close()
+
+    def test_incomplete_listing_cleaned_up(self):
+        self.patch(cache, 'STORE_BATCH_SIZE', 1)
+        listing = self.cache.store(URL, 'c', HEADERS, LISTING)
+        listing.next()
+        listing.next()
+        listing.close()
+        db = self.cache._connect()
+        self.assertEquals(db.execute('SELECT COUNT(*) FROM objects')
+                          .fetchone()[0], 0)
+        self.assertEquals(db.execute('SELECT COUNT(*) FROM containers')
+                          .fetchone()[0], 0)
+        db.close()
+
+
+@testtools.skipIf(cache.sqlite3 is None, 'sqlite3 is not available')
+class TestConnectionListingCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestConnectionListingCache, self).setUp()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.requests = []
+        self.headers = dict(HEADERS)
+
+        def fake_head_container(url, token, container, http_conn=None):
+            self.requests.append('HEAD')
+            return self.headers
+
+        def fake_get_container(url, token, container, marker=None,
+                               prefix=None, full_listing=False, **kwargs):
+            self.requests.append('GET')
+            listing = [o for o in LISTING if o['name'] > (marker or '') and
+                       o['name'].startswith(prefix or '')]
+            if not full_listing:
+                listing = listing[:3]
+            return self.headers, listing
+
+        def fake_put_object(url, token, container, name, contents,
+                            **kwargs):
+            self.requests.append('PUT')
+        self.patch(c, 'http_connection', lambda *args, **kwargs: (
+            None, None))
+        self.patch(c, 'head_container', fake_head_container)
+        self.patch(c, 'get_container', fake_get_container)
+        self.patch(c, 'put_object', fake_put_object)
+        self.conn = c.Connection(
+            preauthurl=URL, preauthtoken='asdf',
+            listing_cache=cache.ListingCache(os.path.join(tmpdir, 'l.db')))
+
+    def test_iter_container(self):
+        self.assertEquals(list(self.conn.iter_container('c')), LISTING)
+        self.assertEquals(self.requests, ['HEAD', 'GET', 'GET', 'GET'])
+        self.requests = []
+        self.assertEquals(list(self.conn.iter_container('c')), LISTING)
+        self.assertEquals(list(self.conn.iter_container('c', prefix='a')),
+                          LISTING[:2])
+        self.assertEquals(self.requests, ['HEAD', 'HEAD'])
+
+        self.headers['x-container-object-count'] = '5'
+        self.requests = []
+        self.assertEquals(list(self.conn.iter_container('c', prefix='a')),
+                          LISTING[:2])
+        self.assertEquals(self.requests, ['HEAD', 'GET', 'GET'])
+
+    def test_get_container(self):
+        self.assertEquals(self.conn.get_container('c', full_listing=True),
+                          (HEADERS, LISTING))
+        self.assertEquals(self.conn.get_container('c', full_listing=True),
+                          (HEADERS, LISTING))
+        self.assertEquals(self.requests, ['HEAD', 'GET', 'HEAD'])
+        self.assertEquals(self.conn.get_container('c')[1], LISTING[:3])
+
+    def test_changes_invalidate(self):
+        list(self.conn.iter_container('c'))
+        self.conn.put_object('c', 'b', 'data')
+        self.requests = []
+        list(self.conn.iter_container('c'))
+        self.assertEquals(self.requests, ['HEAD', 'GET', 'GET', 'GET'])
@@ -0,0 +1,181 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+from hashlib import md5
+from urlparse import parse_qs
+
+import testtools
+
+from swiftclient import green
+from swiftclient.client import ClientException
+
+try:
+    import eventlet
+    from eventlet import wsgi
+except ImportError:
+    eventlet = None
+
+
+class FakeSwift(object):
+    """Just enough of auth v1.0 and an account to run operations against."""
+
+    def __init__(self):
+        self.objects = {}
+        self.auths = 0
+        self.token = None
+        self.fail = []
+        self.sock = eventlet.listen(('127.0.0.1', 0))
+        self.url = 'http://127.0.0.1:%d' % self.sock.getsockname()[1]
+        self.server = eventlet.spawn(wsgi.server, self.sock, self,
+                                     log=open('/dev/null', 'w'))
+
+    def stop(self):
+        self.server.kill()
+        self.sock.close()
+
+    def __call__(self, env, start_response):
+        path = env['PATH_INFO']
+        method = env['REQUEST_METHOD']
+        if path == '/auth/v1.0':
+            self.auths += 1
+            self.token = 'token%d' % self.auths
+            start_response('200 OK', [
+                ('X-Storage-Url', self.url + '/v1/AUTH_test'),
+                ('X-Auth-Token', self.token), ('Content-Length', '0')])
+            return []
+        if env.get('HTTP_X_AUTH_TOKEN') != self.token:
+            start_response('401 Unauthorized', [('Content-Length', '0')])
+            return []
+        if self.fail:
+            start_response(self.fail.pop(0), [('Content-Length', '0')])
+            return []
+        if method == 'PUT':
+            body = env['wsgi.input'].read()
+            self.objects[path] = body
+            start_response('201 Created', [
+                ('Etag', md5(body).hexdigest()), ('Content-Length', '0')])
+            return []
+        if path.count('/') == 3:
+            # a container listing, all in one page
+            marker = parse_qs(env.get('QUERY_STRING', '')).get('marker')
+            body = json.dumps([
+                {'name': name.split('/', 4)[4], 'bytes': len(data)}
+                for name, data in sorted(self.objects.items())
+                if name.startswith(path + '/') and
+                (not marker or name.split('/', 4)[4] > marker[0])])
+            start_response('200 OK', [('Content-Length', str(len(body))),
+                                      ('Content-Type', 'application/json')])
+            return [body]
+        if path not in self.objects:
+            start_response('404 Not Found', [('Content-Length', '0')])
+            return []
+        body = self.objects[path]
+        start_response('200 OK', [('Content-Length', str(len(body))),
+                                  ('Content-Type', 'text/plain'),
+                                  ('Etag', md5(body).hexdigest())])
+        if method == 'HEAD':
+            return []
+        return [body]
+
+
+@testtools.skipIf(eventlet is None, 'eventlet is not installed')
+class TestAsyncConnection(testtools.TestCase):
+
+    def setUp(self):
+        super(TestAsyncConnection, self).setUp()
+        self.swift = FakeSwift()
+        self.addCleanup(self.swift.stop)
+        self.conn = green.AsyncConnection(self.swift.url + '/auth/v1.0',
+                                          'test:tester', 'testing',
+                                          starting_backoff=0)
+        self.addCleanup(self.conn.close)
+
+    def test_concurrent(self):
+        puts = [self.conn.put_object('c', 'o%d' % i, 'data%d' % i)
+                for i in xrange(200)]
+        etags = [gt.wait() for gt in puts]
+        self.assertEquals(etags[7], md5('data7').hexdigest())
+        gets = [self.conn.get_object('c', 'o%d' % i) for i in xrange(200)]
+        self.assertEquals([gt.wait()[1] for gt in gets],
+                          ['data%d' % i for i in xrange(200)])
+        # one authentication shared by every operation
+        self.assertEquals(self.swift.auths, 1)
+        self.assertTrue(len(self.conn._idle) <= 200)
+
+    def test_retry_and_reauth(self):
+        self.conn.put_object('c', 'o', 'data').wait()
+        self.swift.token = 'expired'
+        self.swift.fail = ['503 Service Unavailable']
+        headers = self.conn.head_object('c', 'o').wait()
+        self.assertEquals(headers['content-length'], '4')
+        self.assertEquals(self.swift.auths, 2)
+        self.assertEquals(self.conn.token, 'token2')
+        self.assertEquals(self.swift.fail, [])
+
+    def test_errors(self):
+        gt = self.conn.head_object('c', 'missing')
+        err = self.assertRaises(ClientException, gt.wait)
+        self.assertEquals(err.http_status, 404)
+
+    def test_streaming(self):
+        body = green.BodyQueue()
+
+        def produce():
+            for i in xrange(100):
+                body.write('%03d' % i)
+                eventlet.sleep(0)
+            body.finish()
+        eventlet.spawn(produce)
+        self.conn.put_object('c', 'o', body).wait()
+        expected = ''.join('%03d' % i for i in xrange(100))
+        self.assertEquals(self.swift.objects['/v1/AUTH_test/c/o'], expected)
+
+        headers, chunks = self.conn.get_object('c', 'o',
+                                               resp_chunk_size=7).wait()
+        self.assertEquals(len(self.conn._idle), 0)
+        self.assertEquals(''.join(chunks), expected)
+        self.assertEquals(len(self.conn._idle), 1)
+
+    def test_no_retry_without_reset(self):
+        body = green.BodyQueue()
+        body.write('data')
+        body.finish()
+        self.conn.put_container('c').wait()
+        self.swift.fail = ['503 Service Unavailable']
+        err = self.assertRaises(ClientException,
+                                self.conn.put_object('c', 'o', body).wait)
+        self.assertTrue('ability to reset contents' in str(err))
+
+    def test_listing(self):
+        for i in xrange(3):
+            self.conn.put_object('c', 'o%d' % i, 'data').wait()
+        listing = self.conn.iter_container('c', prefetch=False).wait()
+        self.assertEquals(len(self.conn._idle), 0)
+        self.assertEquals([o['name'] for o in listing], ['o0', 'o1', 'o2'])
+        self.assertEquals(len(self.conn._idle), 1)
+
+    def test_download_object(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'o')
+        self.conn.put_object('c', 'o', 'data').wait()
+        headers, length = self.conn.download_object('c', 'o', path).wait()
+        self.assertEquals(length, 4)
+        with open(path) as fp:
+            self.assertEquals(fp.read(), 'data')
@@ -0,0 +1,65 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+
+import testtools
+
+from swiftclient import journal
+
+
+@testtools.skipIf(journal.sqlite3 is None, 'sqlite3 is not available')
+class TestJournal(testtools.TestCase):
+
+    def setUp(self):
+        super(TestJournal, self).setUp()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'job.journal')
+
+    def test_record(self):
+        j = journal.Journal(self.path)
+        self.assertFalse(j.done(('upload', 'c', 'o')))
+        j.record(('upload', 'c', 'o'))
+        j.record(('segment', 'c', u'\u2603/1'), 'etag')
+        j.record(('upload', 'c', 'caf\xe9', 12))
+        self.assertTrue(j.done(('upload', 'c', 'o')))
+        self.assertFalse(j.done(('upload', 'c')))
+        self.assertFalse(j.done(('upload', 'c', 'o', 'x')))
+        self.assertEquals(j.get(('segment', 'c', '\xe2\x98\x83/1')), 'etag')
+        self.assertTrue(j.done(('upload', 'c', 'caf\xe9', '12')))
+        j.close()
+
+        j = journal.Journal(self.path)
+        self.assertTrue(j.done(('upload', 'c', 'o')))
+        self.assertEquals(j.get(('segment', 'c', u'\u2603/1')), 'etag')
+        j.close()
+
+    def test_batched_commits(self):
+        j = journal.Journal(self.path, commit_interval=3600, commit_every=3)
+        other = journal.Journal(self.path)
+        j.record(('a',))
+        j.record(('b',))
+        self.assertFalse(other.done(('a',)))
+        j.record(('c',))
+        self.assertTrue(other.done(('a',)))
+        j.record(('d',))
+        self.assertFalse(other.done(('d',)))
+        j.flush()
+        self.assertTrue(other.done(('d',)))
+        j.close()
+        other.close()
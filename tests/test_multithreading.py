@@ -0,0 +1,168 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from threading import Event, Lock, Thread
+from time import sleep
+
+import testtools
+
+from swiftclient import multithreading as mt
+from swiftclient.client import ClientException, ConcurrencyController
+
+
+class Closable(object):
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestExecutor(testtools.TestCase):
+
+    def test_results(self):
+        with mt.Executor(lambda item: item * 2, workers=3) as executor:
+            futures = [executor.submit(i) for i in xrange(20)]
+        self.assertEquals([f.result() for f in futures],
+                          [i * 2 for i in xrange(20)])
+        self.assertTrue(all(f.done() for f in futures))
+
+    def test_exceptions(self):
+        def func(item):
+            if item == 2:
+                raise ClientException('Object PUT failed')
+            return item
+
+        with mt.Executor(func, workers=2) as executor:
+            futures = [executor.submit(i) for i in xrange(4)]
+        self.assertEquals(futures[1].result(), 1)
+        self.assertEquals(futures[1].exception(), None)
+        self.assertRaises(ClientException, futures[2].result)
+        self.assertTrue(isinstance(futures[2].exception(), ClientException))
+        self.assertEquals(len(executor.exc_infos), 1)
+        self.assertEquals(futures[2].exception_info(), executor.exc_infos[0])
+        self.assertEquals(futures[1].exception_info(), None)
+
+    def test_make_args(self):
+        made = []
+
+        def make_args():
+            made.append(Closable())
+            return (made[-1],)
+
+        with mt.Executor(lambda item, arg: arg, workers=2,
+                         make_args=make_args) as executor:
+            futures = [executor.submit(i) for i in xrange(10)]
+        self.assertEquals(len(made), 2)
+        self.assertTrue(all(arg.closed for arg in made))
+        self.assertTrue(all(f.result() in made for f in futures))
+
+    def test_make_args_failure(self):
+        def make_args():
+            raise ValueError('no connection')
+
+        with mt.Executor(lambda item: item, make_args=make_args) as executor:
+            future = executor.submit(1)
+        self.assertRaises(ValueError, future.result)
+
+    def test_join(self):
+        done = []
+        executor = mt.Executor(done.append, workers=4)
+        for i in xrange(100):
+            executor.submit(i)
+        executor.join()
+        self.assertEquals(sorted(done), range(100))
+        executor.shutdown()
+
+    def test_backpressure(self):
+        started = Event()
+        release = Event()
+
+        def func(item):
+            started.set()
+            release.wait()
+
+        executor = mt.Executor(func, maxsize=1)
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(release.set)
+        executor.submit(1)
+        started.wait()
+        # the first item has been taken, so one more fits
+        executor.submit(2)
+        self.assertEquals(executor._waiting, 1)
+        # and the next waits for room, until the Executor is cancelled
+        futures = []
+        thread = Thread(target=lambda: futures.append(executor.submit(3)))
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+        executor.cancel()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(futures[0].cancelled())
+
+    def test_cancel(self):
+        started = Event()
+        release = Event()
+
+        def func(item):
+            started.set()
+            release.wait()
+            return item
+
+        executor = mt.Executor(func)
+        first = executor.submit(1)
+        second = executor.submit(2)
+        started.wait()
+        # as attempt_graceful_exit in bin/swift does
+        for thread in executor._threads:
+            thread.abort = True
+        self.assertTrue(executor.cancelled)
+        self.assertTrue(executor.submit(3).cancelled())
+        release.set()
+        executor.shutdown()
+        self.assertEquals(first.result(), 1)
+        self.assertTrue(second.cancelled())
+        self.assertRaises(ClientException, second.result)
+
+    def test_controller(self):
+        busy = [0, 0]
+        lock = Lock()
+
+        def func(item):
+            with lock:
+                busy[0] += 1
+                busy[1] = max(busy)
+            sleep(0.01)
+            with lock:
+                busy[0] -= 1
+
+        controller = ConcurrencyController(4, initial=2)
+        with mt.Executor(func, workers=4,
+                         controller=controller) as executor:
+            for i in xrange(20):
+                executor.submit(i)
+        self.assertEquals(busy[1], 2)
+        self.assertEquals(controller.active, 0)
+
+    def test_result_timeout(self):
+        release = Event()
+        executor = mt.Executor(lambda item: release.wait())
+        future = executor.submit(1)
+        self.assertRaises(ClientException, future.result, 0.01)
+        release.set()
+        executor.shutdown()
+        self.assertTrue(future.done())
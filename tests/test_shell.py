@@ -0,0 +1,232 @@
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from hashlib import md5
+from SocketServer import ThreadingMixIn
+from StringIO import StringIO
+from threading import Thread
+from time import gmtime, strftime, time
+from urllib import unquote
+from urlparse import parse_qs, urlparse
+
+import testtools
+
+try:
+    from simplejson import dumps as json_dumps
+except ImportError:
+    from json import dumps as json_dumps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeSwift(ThreadingMixIn, HTTPServer):
+    """
+    Just enough of auth v1.0 and one account, in memory, to run the swift
+    command against.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FakeSwiftHandler)
+        self.url = 'http://127.0.0.1:%d' % self.server_address[1]
+        self.containers = set()
+        # (container, object) -> (body, headers, time stored)
+        self.objects = {}
+        self.requests = []
+        self.capabilities = None
+        # Response Status of extract-archive; when it is not 2xx only the
+        # first file is created and the second reported as failed
+        self.archive_status = '201 Created'
+        self.thread = Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeSwiftHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, headers=None, body=''):
+        self.send_response(status)
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _handle(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        path = unquote(parsed.path)
+        query = dict((k, v[0]) for k, v in parse_qs(parsed.query).items())
+        server.requests.append((self.command, path, query))
+        body = ''
+        if self.headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                body += self.rfile.read(size + 2)[:size]
+                if not size:
+                    break
+        elif self.headers.get('content-length'):
+            body = self.rfile.read(int(self.headers['content-length']))
+        if path == '/auth/v1.0':
+            return self._respond(200, {
+                'X-Storage-Url': server.url + '/v1/AUTH_test',
+                'X-Auth-Token': 'token'})
+        if path == '/info':
+            if server.capabilities is None:
+                return self._respond(404)
+            return self._respond(200, {}, json_dumps(server.capabilities))
+        parts = path.split('/', 4)[3:]
+        container = parts[0]
+        if 'extract-archive' in query:
+            return self._extract(container, body)
+        if len(parts) == 1:
+            if self.command == 'PUT':
+                server.containers.add(container)
+                return self._respond(201)
+            if container not in server.containers:
+                return self._respond(404)
+            names = sorted(o for c, o in server.objects if c == container)
+            headers = {'X-Container-Object-Count': str(len(names))}
+            if self.command == 'HEAD':
+                return self._respond(204, headers)
+            listing = []
+            for name in names:
+                if name <= query.get('marker', '') or \
+                        not name.startswith(query.get('prefix', '')):
+                    continue
+                data, obj_headers, stored = server.objects[container, name]
+                listing.append({
+                    'name': name, 'bytes': len(data),
+                    'hash': md5(data).hexdigest(),
+                    'content_type': obj_headers['content-type'],
+                    'last_modified': strftime('%Y-%m-%dT%H:%M:%S.000000',
+                                              gmtime(stored))})
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+            return self._respond(200, headers, json_dumps(listing))
+        key = container, parts[1]
+        if self.command == 'PUT':
+            headers = dict((h, v) for h, v in self.headers.items()
+                           if h.startswith('x-object-meta-'))
+            headers['content-type'] = self.headers.get(
+                'content-type', 'application/octet-stream')
+            server.objects[key] = body, headers, time()
+            return self._respond(201, {'Etag': md5(body).hexdigest()})
+        if key not in server.objects:
+            return self._respond(404)
+        data, headers, _junk = server.objects[key]
+        headers = dict(headers, etag=md5(data).hexdigest())
+        if self.command == 'DELETE':
+            del server.objects[key]
+            return self._respond(204)
+        return self._respond(200, headers, data)
+
+    def _extract(self, container, body):
+        server = self.server
+        tar = tarfile.open(fileobj=StringIO(body))
+        members = [m for m in tar.getmembers() if m.isfile()]
+        errors = []
+        for i, member in enumerate(members):
+            if server.archive_status[0] != '2' and i > 0:
+                if i == 1:
+                    errors.append(['/%s/%s' % (container, member.name),
+                                   '503 Service Unavailable'])
+                continue
+            server.objects[container, member.name] = (
+                tar.extractfile(member).read(),
+                {'content-type': 'application/octet-stream'}, time())
+        return self._respond(201, {}, json_dumps({
+            'Response Status': server.archive_status,
+            'Number Files Created': len(members) - len(errors),
+            'Errors': errors}))
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = _handle
+
+
+class TestUpload(testtools.TestCase):
+
+    def setUp(self):
+        super(TestUpload, self).setUp()
+        self.swift = FakeSwift()
+        self.addCleanup(self.swift.stop)
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        for path, data in (('f1', '1'), ('f2', '22'), ('d/e/x', 'x')):
+            path = os.path.join(self.tmpdir, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as fp:
+                fp.write(data)
+            # written well before they are uploaded
+            os.utime(path, (time() - 60, time() - 60))
+        os.mkdir(os.path.join(self.tmpdir, 'empty'))
+
+    def run_swift(self, *args):
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'bin', 'swift'),
+             '-A', self.swift.url + '/auth/v1.0', '-U', 'test:tester',
+             '-K', 'testing'] + list(args),
+            cwd=self.tmpdir, env=env, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        self.assertEquals((proc.returncode, err), (0, ''))
+        return out
+
+    def test_upload_changed_dot(self):
+        self.run_swift('upload', 'c1', '.')
+        self.assertEquals(sorted(o for c, o in self.swift.objects),
+                          ['d/e/x', 'empty', 'f1', 'f2'])
+        del self.swift.requests[:]
+        self.run_swift('upload', 'c1', '.', '--changed')
+        # one listing of the whole container, and nothing uploaded again
+        listings = [query for method, path, query in self.swift.requests
+                    if method == 'GET' and path == '/v1/AUTH_test/c1']
+        self.assertEquals([query.get('prefix') for query in listings],
+                          [None] * len(listings))
+        puts = [path for method, path, query in self.swift.requests
+                if method == 'PUT' and path.count('/') > 3]
+        self.assertEquals(puts, [])
+
+    def test_upload_archive_failed(self):
+        self.swift.capabilities = {'bulk_upload': {}}
+        self.swift.archive_status = '502 Bad Gateway'
+        self.run_swift('upload', 'c1', 'f1', 'f2', 'd', '--archive-threshold',
+                       '100')
+        # the extraction stopped early, so every file is uploaded alone
+        puts = sorted(path for method, path, query in self.swift.requests
+                      if method == 'PUT' and path.count('/') > 3)
+        self.assertEquals(puts, ['/v1/AUTH_test/c1/d/e/x',
+                                 '/v1/AUTH_test/c1/f1',
+                                 '/v1/AUTH_test/c1/f2'])
+        self.assertEquals(sorted(o for c, o in self.swift.objects),
+                          ['d/e/x', 'f1', 'f2'])
@@ -14,10 +14,17 @@
 # limitations under the License.
 
 # TODO: More tests
+import os
+import shutil
 import socket
 import StringIO
+import tarfile
+import tempfile
 import testtools
 import warnings
+from hashlib import md5
+from json import dumps as json_dumps
+from itertools import islice
 from urlparse import urlparse
 
 # TODO: mock http connection class with more control over headers
@@ -113,6 +120,62 @@ class TestConfigTrueValue(testtools.TestCase):
             u.TRUE_VALUES = orig_trues
 
 
+class TestListingHelpers(testtools.TestCase):
+
+    def test_parse_last_modified(self):
+        self.assertEquals(u.parse_last_modified('2013-06-01T12:00:00.250000'),
+                          1370088000.25)
+        self.assertEquals(u.parse_last_modified('2013-06-01T12:00:00'),
+                          1370088000)
+        self.assertEquals(u.parse_last_modified('yesterday'), None)
+        self.assertEquals(u.parse_last_modified(None), None)
+
+    def test_match_listing(self):
+        listing = [{'name': n} for n in (u'a', u'b/1', u'c', u'\u2603')]
+        names = ['0', 'a', 'b', 'b/1', 'd', '\xe2\x98\x83', '\xef']
+        self.assertEquals(
+            [(name, entry and entry['name'])
+             for name, entry in u.match_listing(names, iter(listing))],
+            [('0', None), ('a', u'a'), ('b', None), ('b/1', u'b/1'),
+             ('d', None), ('\xe2\x98\x83', u'\u2603'), ('\xef', None)])
+        self.assertEquals(list(u.match_listing([u'a'], [])), [(u'a', None)])
+
+
+class TestTarStream(testtools.TestCase):
+
+    def test_archive(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        members = []
+        for i, size in enumerate((0, 1, 511, 512, 70000)):
+            path = os.path.join(tmpdir, str(i))
+            with open(path, 'wb') as f:
+                f.write(chr(ord('a') + i) * size)
+            members.append((path, 'dir/obj%d' % i,
+                            {'SCHILY.xattr.user.meta.mtime': '%d.5' % i}))
+        stream = u.TarStream(members, read_size=1000)
+        data = ''
+        while True:
+            chunk = stream.read(777)
+            if not chunk:
+                break
+            data += chunk
+        self.assertEquals(len(data), len(stream))
+        self.assertEquals(stream.tell(), len(data))
+        stream.seek(0)
+        self.assertEquals(stream.read(), data)
+        self.assertRaises(IOError, stream.seek, 10)
+
+        tar = tarfile.open(mode='r|', fileobj=StringIO.StringIO(data))
+        for i, member in enumerate(tar):
+            self.assertEquals(member.name, 'dir/obj%d' % i)
+            self.assertEquals(member.pax_headers, {
+                'SCHILY.xattr.user.meta.mtime': '%d.5' % i})
+            self.assertEquals(tar.extractfile(member).read(),
+                              open(members[i][0], 'rb').read())
+        self.assertEquals(i, 4)
+
+
 class MockHttpTest(testtools.TestCase):
 
     def setUp(self):
@@ -186,9 +249,396 @@ class TestHttpHelpers(MockHttpTest):
         url = 'ftp://www.test.com'
         self.assertRaises(c.ClientException, c.http_connection, url)
 
+    def test_ssl_context_shared_per_endpoint(self):
+        if not hasattr(c.ssl, 'SSLContext'):
+            return
+        _junk, conn = c.http_connection('https://www.test.com/v1/AUTH_a')
+        _junk, conn2 = c.http_connection('https://www.test.com/v1/AUTH_b')
+        self.assertTrue(conn._context is conn2._context)
+        _junk, conn3 = c.http_connection('https://other.test.com/')
+        self.assertFalse(conn3._context is conn._context)
+        _junk, conn4 = c.http_connection('https://www.test.com/',
+                                         insecure=True)
+        self.assertFalse(conn4._context is conn._context)
+        self.assertEquals(conn4._context.verify_mode, c.ssl.CERT_NONE)
+
+
+class TestConnectionPool(MockHttpTest):
+
+    class PoolConn(object):
+
+        def __init__(self):
+            self.closed = False
+            self.sock = None
+
+        def close(self):
+            self.closed = True
+
+        def connect(self):
+            self.connected = True
+            self.sock, theirs = socket.socketpair()
+            self.connects = getattr(self, 'connects', 0) + 1
+            self.addCleanup(self.sock.close)
+            self.addCleanup(theirs.close)
+
+    def setUp(self):
+        super(TestConnectionPool, self).setUp()
+        self.made = []
+
+        def fake_http_connection(url, proxy=None, **kwargs):
+            conn = self.PoolConn()
+            conn.addCleanup = self.addCleanup
+            conn.kwargs = kwargs
+            self.made.append(conn)
+            return urlparse(url), conn
+        c.http_connection = fake_http_connection
+
+    def test_reuse(self):
+        pool = c.ConnectionPool()
+        parsed, conn = pool.get('http://www.test.com/v1/AUTH_a')
+        pool.put((parsed, conn))
+        parsed, conn2 = pool.get('http://www.test.com/v1/AUTH_b')
+        self.assertTrue(conn is conn2)
+        self.assertEquals(parsed.path, '/v1/AUTH_b')
+        self.assertEquals(len(self.made), 1)
+        _junk, conn3 = pool.get('https://www.test.com/v1/AUTH_a')
+        self.assertFalse(conn3 is conn)
+
+    def test_stale_not_reused(self):
+        pool = c.ConnectionPool()
+        http_conn = pool.get('http://www.test.com/')
+        ours, theirs = socket.socketpair()
+        try:
+            http_conn[1].sock = ours
+            theirs.close()
+            pool.put(http_conn)
+            _junk, conn = pool.get('http://www.test.com/')
+            self.assertTrue(http_conn[1].closed)
+            self.assertFalse(conn is http_conn[1])
+        finally:
+            ours.close()
+
+    def test_max_per_host(self):
+        pool = c.ConnectionPool(max_per_host=1)
+        first = pool.get('http://www.test.com/')
+        second = pool.get('http://www.test.com/')
+        pool.put(first)
+        pool.put(second)
+        self.assertFalse(first[1].closed)
+        self.assertTrue(second[1].closed)
+
+    def test_drain(self):
+        pool = c.ConnectionPool(max_drain=10)
+        http_conn = pool.get('http://www.test.com/')
+        body = StringIO.StringIO('x' * 8)
+
+        class Response(object):
+
+            def isclosed(self):
+                return body.tell() == 8
+
+            def read(self, amt):
+                return body.read(amt)
+
+        http_conn[1]._HTTPConnection__response = Response()
+        pool.put(http_conn)
+        self.assertFalse(http_conn[1].closed)
+        self.assertEquals(body.tell(), 8)
+
+        body = StringIO.StringIO('x' * 20)
+        http_conn = pool.get('http://www.test.com/')
+        http_conn[1]._HTTPConnection__response = Response()
+        pool.put(http_conn)
+        self.assertTrue(http_conn[1].closed)
+
+    def test_prime(self):
+        pool = c.ConnectionPool()
+        pool.prime('http://www.test.com/', 3)
+        self.assertEquals(len(self.made), 3)
+        self.assertTrue(all(conn.connected for conn in self.made))
+        for _junk in xrange(3):
+            pool.get('http://www.test.com/')
+        self.assertEquals(len(self.made), 3)
+
+    def test_prime_again(self):
+        pool = c.ConnectionPool()
+        pool.prime('http://www.test.com/', 2)
+        # the idle connections count towards the number asked for
+        pool.prime('http://www.test.com/', 3)
+        self.assertEquals(len(self.made), 3)
+        self.assertEquals([conn.connects for conn in self.made], [1, 1, 1])
+
+    def test_connection_prime(self):
+        pool = c.ConnectionPool()
+        conn = c.Connection(preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='token', pool=pool,
+                            connect_timeout=5, insecure=True)
+        conn.prime(2)
+        self.assertEquals(len(self.made), 2)
+        self.assertEquals(self.made[0].kwargs,
+                          {'connect_timeout': 5, 'insecure': True})
+        # the Connection's requests use the connections primed
+        self.assertTrue(conn.http_connection()[1] in self.made)
+        self.assertEquals(len(self.made), 2)
+
+    def test_connection_uses_pool(self):
+        pool = c.ConnectionPool()
+        conn = c.Connection(preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='token', pool=pool)
+        http_conn = conn.http_connection()
+        conn.http_conn = http_conn
+        conn.close()
+        self.assertEquals(conn.http_conn, None)
+        self.assertTrue(conn.http_connection()[1] is http_conn[1])
+
+
+class TestEndpointSelector(MockHttpTest):
+
+    def setUp(self):
+        super(TestEndpointSelector, self).setUp()
+        self.selector = c.EndpointSelector(['http://1.1.1.1:8080/ignored',
+                                            'http://2.2.2.2:8080'])
+        self.selector._probed = True
+
+    def test_url_for(self):
+        self.assertEquals(
+            self.selector.url_for('https://proxy/v1/AUTH_a',
+                                  'http://2.2.2.2:8080'),
+            'http://2.2.2.2:8080/v1/AUTH_a')
+        self.assertEquals(self.selector.url_for('http://proxy/v1', None),
+                          'http://proxy/v1')
+
+    def test_least_outstanding(self):
+        self.selector.latency = {'http://1.1.1.1:8080': 0.5,
+                                 'http://2.2.2.2:8080': 0.1}
+        first = self.selector.acquire('http://proxy/v1')
+        self.assertEquals(first, 'http://2.2.2.2:8080')
+        second = self.selector.acquire('http://proxy/v1')
+        self.assertEquals(second, 'http://1.1.1.1:8080')
+        self.selector.release(first)
+        self.assertEquals(self.selector.acquire('http://proxy/v1'), first)
+
+    def test_failed_endpoint_skipped(self):
+        self.selector.mark_failed('http://1.1.1.1:8080')
+        for _junk in xrange(3):
+            self.assertEquals(self.selector.acquire('http://proxy/v1'),
+                              'http://2.2.2.2:8080')
+        self.selector.failed_until['http://1.1.1.1:8080'] = 0
+        self.assertEquals(self.selector.acquire('http://proxy/v1'),
+                          'http://1.1.1.1:8080')
+
+    def test_resolve(self):
+        endpoints = c.resolve_endpoints('http://127.0.0.1:8080/v1/AUTH_a')
+        self.assertEquals(endpoints, ['http://127.0.0.1:8080'])
+
+    def test_connection_routes_and_fails_over(self):
+        urls = []
+        ok_http_connection = self.fake_http_connection(200)
+
+        def fake_http_connection(url, proxy=None):
+            urls.append(url)
+            parsed = urlparse(url)
+            if parsed.hostname == '1.1.1.1':
+                raise socket.error('down')
+            return ok_http_connection(url)
+        c.http_connection = fake_http_connection
+        c.sleep = lambda *args: None
+        self.selector.latency = {'http://1.1.1.1:8080': 0.1,
+                                 'http://2.2.2.2:8080': 0.5}
+        conn = c.Connection(preauthurl='http://proxy/v1/AUTH_a',
+                            preauthtoken='token', endpoints=self.selector)
+        conn.head_account()
+        self.assertEquals(urls, ['http://1.1.1.1:8080/v1/AUTH_a',
+                                 'http://2.2.2.2:8080/v1/AUTH_a'])
+        self.assertTrue(
+            self.selector.failed_until['http://1.1.1.1:8080'] > 0)
+        self.assertEquals(self.selector.outstanding,
+                          {'http://1.1.1.1:8080': 0,
+                           'http://2.2.2.2:8080': 0})
+
+
+class TestTimeouts(MockHttpTest):
+
+    def test_http_connection_timeouts(self):
+        _junk, conn = c.http_connection('http://www.test.com',
+                                        connect_timeout=3)
+        self.assertEquals(conn.timeout, 3)
+        _junk, conn = c.http_connection('https://www.test.com')
+        self.assertEquals(conn.timeout, socket._GLOBAL_DEFAULT_TIMEOUT)
+
+    def test_read_timeout_applied_after_connect(self):
+        ours, theirs = socket.socketpair()
+        orig_connect = c.HTTPConnection.connect
+        try:
+            c.HTTPConnection.connect = lambda conn: setattr(conn, 'sock',
+                                                            ours)
+            _junk, conn = c.http_connection('http://www.test.com',
+                                            connect_timeout=3,
+                                            read_timeout=7)
+            conn.connect()
+            self.assertEquals(ours.gettimeout(), 7)
+        finally:
+            c.HTTPConnection.connect = orig_connect
+            ours.close()
+            theirs.close()
+
+    def test_throughput_monitor(self):
+        monitor = c.ThroughputMonitor(100, window=0)
+        monitor.update(1000)
+        monitor.window_start -= 10
+        self.assertRaises(socket.timeout, monitor.update, 10)
+
+    def test_deadline_stops_retries(self):
+        c.http_connection = self.fake_http_connection(*([500] * 6))
+        now = [1000.0]
+
+        def fake_sleep(seconds):
+            self.slept.append(seconds)
+            now[0] += seconds
+        self.slept = []
+        c.sleep = fake_sleep
+        c.time = lambda: now[0]
+        conn = c.Connection(preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='token', deadline=2.5)
+        err = self.assertRaises(c.ClientException, conn.head_account)
+        self.assertEquals(err.http_status, 500)
+        self.assertEquals(self.slept, [1, 1.5])
+        # the deadline had passed by the end of the second backoff
+        self.assertEquals(conn.attempts, 2)
+
+    def test_slow_upload_retried(self):
+
+        class UploadConnection(object):
+
+            def __init__(self):
+                self.sent = []
+                self.status = 201
+                self.reason = 'Created'
+
+            def putrequest(self, *args, **kwargs):
+                pass
+
+            def putheader(self, *args, **kwargs):
+                pass
+
+            def endheaders(self):
+                pass
+
+            def send(self, data):
+                self.sent.append(data)
+
+            def getresponse(self):
+                return self
+
+            def getheader(self, name, default=None):
+                return default
+
+            def read(self):
+                return ''
+
+        conns = []
+
+        def upload_http_connection(url, proxy=None):
+            conns.append(UploadConnection())
+            return urlparse(url), conns[-1]
+        c.http_connection = upload_http_connection
+        c.sleep = lambda *args: None
+        conn = c.Connection(preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='token', min_throughput=1)
+        orig_update = c.ThroughputMonitor.update
+        calls = []
+
+        def slow_update(monitor, nbytes):
+            calls.append(nbytes)
+            if len(calls) == 1:
+                raise socket.timeout('too slow')
+            return orig_update(monitor, nbytes)
+        c.ThroughputMonitor.update = slow_update
+        try:
+            conn.put_object('c', 'o', StringIO.StringIO('abc'),
+                            content_length=3)
+        finally:
+            c.ThroughputMonitor.update = orig_update
+        self.assertEquals(calls, [3, 3])
+        self.assertEquals(conn.attempts, 2)
+        self.assertEquals(len(conns), 2)
+        self.assertEquals(conns[1].sent, ['abc'])
+
+
 # TODO: following tests are placeholders, need more tests, better coverage
 
 
+class TestAdaptiveChunkSizer(MockHttpTest):
+
+    def _run(self, sizer, rate, chunks):
+        now = [1000.0]
+        c.time = lambda: now[0]
+        sizer.start()
+        for _ in xrange(chunks):
+            now[0] += float(sizer.size) / rate
+            sizer.update(sizer.size)
+
+    def test_grows_on_fast_link(self):
+        sizer = c.AdaptiveChunkSizer(max_size=1048576)
+        self._run(sizer, 100000000, 20)
+        self.assertEquals(sizer.size, 1048576)
+        stats = sizer.stats()
+        self.assertEquals(stats['min_size'], 16384)
+        self.assertEquals(stats['max_size'], 1048576)
+        self.assertEquals(stats['size'], 1048576)
+        self.assertEquals(stats['chunks'], 20)
+        self.assertEquals(sum(stats['sizes'].values()), 20)
+        self.assertTrue(65536 in stats['sizes'])
+        self.assertEquals(round(stats['throughput']), 100000000)
+
+    def test_shrinks_on_slow_link(self):
+        sizer = c.AdaptiveChunkSizer()
+        self._run(sizer, 100000, 10)
+        self.assertEquals(sizer.size, 16384)
+        self.assertTrue(sizer.stats()['chunk_rate'] < 10)
+
+    def test_steady(self):
+        sizer = c.AdaptiveChunkSizer(target_interval=0.05)
+        self._run(sizer, 1310720, 10)
+        self.assertEquals(sizer.size, 65536)
+
+    def test_bad_bounds(self):
+        self.assertRaises(ValueError, c.AdaptiveChunkSizer, 65536, 16384)
+
+    def test_put_object(self):
+        sent = []
+        conn = c.http_connection('http://www.test.com/')
+        conn[1].getresponse = MockHttpResponse().fake_response
+        conn[1].send = lambda data: sent.append(len(data))
+        sizer = c.AdaptiveChunkSizer(min_size=8, max_size=32, initial_size=8)
+        self._run(sizer, 1000, 0)
+        c.put_object('http://www.test.com', 'asdf', 'c', 'o',
+                     StringIO.StringIO('x' * 100), content_length=100,
+                     http_conn=conn, chunk_sizer=sizer)
+        # time doesn't move, so every chunk looks infinitely fast
+        self.assertEquals(sent[1:], [8, 16, 32, 32, 12])
+
+    def test_connection(self):
+        conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                            adaptive_chunk_size=True, min_chunk_size=1024,
+                            max_chunk_size=2048)
+        self.assertEquals(conn.chunk_sizer.stats()['size'], 2048)
+        self.assertEquals(c.Connection('http://www.test.com', 'asdf',
+                                       'asdf').chunk_sizer, None)
+
+    def test_clone(self):
+        conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                            adaptive_chunk_size=True, min_chunk_size=1000,
+                            max_chunk_size=3000)
+        conn.chunk_sizer.update(1000)
+        clone = conn.clone()
+        self.assertFalse(clone.chunk_sizer is conn.chunk_sizer)
+        stats = clone.chunk_sizer.stats()
+        self.assertEquals((stats['min_size'], stats['max_size'],
+                           stats['size'], stats['chunks']),
+                          (1000, 3000, conn.chunk_sizer.size, 0))
+
+
 class TestGetAuth(MockHttpTest):
 
     def test_ok(self):
@@ -488,6 +938,168 @@ class TestDeleteContainer(MockHttpTest):
         self.assertEquals(value, None)
 
 
+class TestRateLimiter(MockHttpTest):
+
+    def setUp(self):
+        super(TestRateLimiter, self).setUp()
+        self.now = [1000.0]
+        self.slept = []
+        c.time = lambda: self.now[0]
+
+        def fake_sleep(seconds):
+            self.slept.append(seconds)
+            self.now[0] += seconds
+        c.sleep = fake_sleep
+
+    def test_take(self):
+        limiter = c.RateLimiter(100)
+        limiter.take(100)
+        self.assertEquals(self.slept, [])
+        limiter.take(50)
+        self.assertEquals(self.slept, [0.5])
+        # idle time refills the bucket, but only up to the burst size
+        self.now[0] += 10
+        limiter.take(100)
+        limiter.take(10)
+        self.assertEquals(self.slept, [0.5, 0.1])
+
+    def test_debt(self):
+        limiter = c.RateLimiter(100, burst=10)
+        limiter.take(210)
+        self.assertEquals(self.slept, [2.0])
+
+    def test_quantum(self):
+        limiter = c.RateLimiter(100, burst=100, quantum=50)
+        limiter.take(200)
+        self.assertEquals(self.slept, [0.5, 0.5])
+
+    def test_bad_rate(self):
+        self.assertRaises(ValueError, c.RateLimiter, 0)
+
+    def test_put_object(self):
+        def http_conn():
+            conn = c.http_connection('http://www.test.com/')
+            conn[1].getresponse = MockHttpResponse().fake_response
+            conn[1].send = lambda data: None
+            return conn
+        limiter = c.RateLimiter(100)
+        c.put_object('http://www.test.com', 'asdf', 'c', 'o',
+                     StringIO.StringIO('x' * 300), content_length=300,
+                     chunk_size=100, http_conn=http_conn(),
+                     rate_limiter=limiter)
+        self.assertEquals(self.slept, [1.0, 1.0])
+        c.put_object('http://www.test.com', 'asdf', 'c', 'o',
+                     StringIO.StringIO('x' * 100), chunk_size=50,
+                     http_conn=http_conn(), rate_limiter=limiter)
+        self.assertEquals(self.slept, [1.0, 1.0, 0.5, 0.5])
+        conn = http_conn()
+        conn[1].request = lambda *args: None
+        c.put_object('http://www.test.com', 'asdf', 'c', 'o', 'x' * 100,
+                     http_conn=conn, rate_limiter=limiter)
+        self.assertEquals(self.slept, [1.0, 1.0, 0.5, 0.5, 1.0])
+
+    def test_get_object(self):
+        c.http_connection = self.fake_http_connection(200, body='x' * 200)
+        limiter = c.RateLimiter(100)
+        headers, body = c.get_object('http://www.test.com', 'asdf', 'c', 'o',
+                                     rate_limiter=limiter)
+        self.assertEquals(body, 'x' * 200)
+        self.assertEquals(self.slept, [1.0])
+
+    def test_connection(self):
+        up, down = c.RateLimiter(100), c.RateLimiter(200)
+        conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                            upload_limiter=up, download_limiter=down)
+        self.assertTrue(conn.upload_limiter is up)
+        self.assertTrue(conn.clone().download_limiter is down)
+
+
+class TestConcurrencyController(MockHttpTest):
+
+    def test_slow_start(self):
+        controller = c.ConcurrencyController(10)
+        self.assertEquals(controller.stats()['limit'], 1)
+        for _junk in xrange(20):
+            controller.record(0.1)
+        stats = controller.stats()
+        self.assertEquals(stats['limit'], 10)
+        self.assertEquals(stats['peak'], 10)
+        self.assertEquals(stats['ceiling'], 10)
+
+    def test_overload(self):
+        now = [1000.0]
+        c.time = lambda: now[0]
+        controller = c.ConcurrencyController(16, initial=16)
+        controller.record(1.0)
+        controller.record(1.0, overloaded=True)
+        self.assertEquals(controller.stats()['limit'], 8)
+        # the same overload seen by other requests of the round
+        controller.record(1.0, overloaded=True)
+        self.assertEquals(controller.stats()['limit'], 8)
+        now[0] += 1
+        controller.record(1.0, overloaded=True)
+        self.assertEquals(controller.stats()['limit'], 4)
+        self.assertEquals(controller.stats()['decreases'], 2)
+        # past slow start, growth is about one per round
+        for _junk in xrange(5):
+            controller.record(1.0)
+        self.assertEquals(controller.stats()['limit'], 5)
+
+    def test_floor(self):
+        controller = c.ConcurrencyController(4, floor=2, initial=2)
+        controller.record(1.0, overloaded=True)
+        self.assertEquals(controller.stats()['limit'], 2)
+
+    def test_latency_holds_growth(self):
+        controller = c.ConcurrencyController(10)
+        controller.record(0.1)
+        for _junk in xrange(10):
+            controller.record(10.0)
+        self.assertEquals(controller.stats()['limit'], 2)
+
+    def test_acquire(self):
+        controller = c.ConcurrencyController(2)
+        controller.acquire()
+        acquired = []
+        thread = c.Thread(target=lambda: acquired.append(
+            controller.acquire()))
+        thread.start()
+        thread.join(0.1)
+        self.assertEquals(acquired, [])
+        controller.release()
+        thread.join(5)
+        self.assertEquals(acquired, [None])
+        controller.record(0.1)
+        controller.acquire()
+        self.assertEquals(controller.active, 2)
+
+    def test_connection(self):
+        c.http_connection = self.fake_http_connection(204)
+        c.sleep = lambda *args: None
+        failures = [c.ClientException('Account HEAD failed', http_status=503),
+                    socket.timeout('timed out'),
+                    c.ClientException('Account HEAD failed', http_status=404)]
+
+        def fake_head_account(url, token, http_conn=None):
+            if failures:
+                raise failures.pop(0)
+            return {}
+        c.head_account = fake_head_account
+        recorded = []
+        controller = c.ConcurrencyController(10)
+        controller.record = lambda latency, overloaded=False: \
+            recorded.append(overloaded)
+        conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                            preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='asdf', concurrency=controller)
+        self.assertRaises(c.ClientException, conn.head_account)
+        # a 404 is not a sign of overload
+        self.assertEquals(recorded, [True, True])
+        conn.head_account()
+        self.assertEquals(recorded, [True, True, False])
+        self.assertTrue(conn.clone().concurrency is controller)
+
+
 class TestGetObject(MockHttpTest):
 
     def test_server_error(self):
@@ -501,6 +1113,112 @@ class TestGetObject(MockHttpTest):
         c.get_object('http://www.test.com', 'asdf', 'asdf', 'asdf',
                      query_string="hello=20")
 
+    def _socket_connection(self, *responses):
+        ours, theirs = socket.socketpair()
+        self.addCleanup(ours.close)
+        self.addCleanup(theirs.close)
+        theirs.sendall(''.join(responses))
+        conn = c.http_connection('http://www.test.com/')
+        conn[1].connect = lambda: None
+        # socketpair() gives bare sockets; wrap it the way connect() does
+        conn[1].sock = socket.socket(_sock=ours)
+        return conn
+
+    def test_resp_buffer(self):
+        body = ''.join(chr(i) for i in xrange(100))
+        conn = self._socket_connection(
+            'HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\n' + body,
+            'HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nnext!')
+        buf = bytearray(40)
+        headers, reader = c.get_object('http://www.test.com', 'asdf', 'c',
+                                       'o', http_conn=conn, resp_buffer=buf)
+        self.assertTrue(isinstance(reader, c.ObjectBody))
+        chunks = []
+        for chunk in reader:
+            self.assertTrue(isinstance(chunk, memoryview))
+            chunks.append(chunk.tobytes())
+        self.assertEquals(''.join(chunks), body)
+        self.assertEquals([len(chunk) for chunk in chunks], [40, 40, 20])
+        self.assertEquals(buf[:20], body[80:])
+        # the body was not over-read, so the connection can be reused
+        headers, body = c.get_object('http://www.test.com', 'asdf', 'c', 'o',
+                                     http_conn=conn)
+        self.assertEquals(body, 'next!')
+
+    def test_resp_buffer_pooled(self):
+        conn = self._socket_connection(
+            'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+            'a\r\n0123456789\r\n5\r\nabcde\r\n0\r\n\r\n')
+        pool = c.BufferPool()
+        c.buffer_pool = pool
+        headers, reader = c.get_object('http://www.test.com', 'asdf', 'c',
+                                       'o', http_conn=conn, resp_buffer=True,
+                                       resp_chunk_size=8)
+        buf = reader.buf
+        self.assertEquals(len(buf), 8)
+        self.assertEquals(''.join(chunk.tobytes() for chunk in reader),
+                          '0123456789abcde')
+        self.assertTrue(pool.get(8) is buf)
+        self.assertFalse(pool.get(8) is buf)
+
+    def test_resp_buffer_empty(self):
+        conn = self._socket_connection(
+            'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n')
+        conn[1].sock.settimeout(5)
+        headers, reader = c.get_object('http://www.test.com', 'asdf', 'c',
+                                       'o', http_conn=conn,
+                                       resp_buffer=bytearray(4))
+        self.assertEquals(list(reader), [])
+
+    def test_resp_buffer_without_memoryview(self):
+        # as on Python 2.6
+        self.patch(c, 'memoryview', None)
+        conn = self._socket_connection(
+            'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n0123456789',
+            'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n0123456789')
+        pool = c.BufferPool()
+        c.buffer_pool = pool
+        headers, reader = c.get_object('http://www.test.com', 'asdf', 'c',
+                                       'o', http_conn=conn, resp_buffer=True,
+                                       resp_chunk_size=4)
+        buf = reader.buf
+        self.assertEquals(list(reader), ['0123', '4567', '89'])
+        self.assertTrue(pool.get(4) is buf)
+        headers, reader = c.get_object('http://www.test.com', 'asdf', 'c',
+                                       'o', http_conn=conn,
+                                       resp_buffer=bytearray(4))
+        mine = bytearray(16)
+        self.assertEquals(reader.readinto(mine), 10)
+        self.assertEquals(mine[:10], '0123456789')
+
+    def test_readinto(self):
+        conn = self._socket_connection(
+            'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n0123456789')
+        headers, reader = c.get_object('http://www.test.com', 'asdf', 'c',
+                                       'o', http_conn=conn,
+                                       resp_buffer=bytearray(4))
+        mine = bytearray(16)
+        self.assertEquals(reader.readinto(mine), 10)
+        self.assertEquals(mine[:10], '0123456789')
+        self.assertEquals(reader.readinto(mine), 0)
+
+    def test_max_body_size(self):
+        closed = []
+
+        def fake_http_connection(url, proxy=None):
+            parsed, conn = fake(url, proxy)
+            conn.close = lambda: closed.append(True)
+            return parsed, conn
+        fake = self.fake_http_connection(200, 200, body='x' * 10)
+        c.http_connection = fake_http_connection
+        self.assertRaises(c.ClientException, c.get_object,
+                          'http://www.test.com', 'asdf', 'c', 'o',
+                          max_body_size=9)
+        self.assertEquals(closed, [True])
+        headers, body = c.get_object('http://www.test.com', 'asdf', 'c', 'o',
+                                     max_body_size=10)
+        self.assertEquals(body, 'x' * 10)
+
 
 class TestHeadObject(MockHttpTest):
 
@@ -573,6 +1291,194 @@ class TestPutObject(MockHttpTest):
         c.put_object('http://www.test.com', 'asdf', 'asdf', 'asdf',
                      query_string="hello=20")
 
+    def test_response_dict(self):
+        c.http_connection = self.fake_http_connection(201, body='report')
+        response = {}
+        c.put_object('http://www.test.com', 'asdf', 'c', None, 'x',
+                     query_string='extract-archive=tar',
+                     response_dict=response)
+        self.assertEquals(response['status'], 201)
+        self.assertEquals(response['body'], 'report')
+        self.assertEquals(response['headers']['x-works'], 'yes')
+
+    def test_chunked(self):
+        sent = []
+
+        def send(data):
+            if isinstance(data, memoryview):
+                data = data.tobytes()
+            sent.append(data)
+
+        for contents in (StringIO.StringIO('a' * 20 + 'b' * 5),
+                         tempfile.TemporaryFile()):
+            if not isinstance(contents, StringIO.StringIO):
+                contents.write('a' * 20 + 'b' * 5)
+                contents.seek(0)
+            conn = c.http_connection('http://www.test.com/')
+            conn[1].getresponse = MockHttpResponse().fake_response
+            conn[1].send = send
+            sent[:] = []
+            c.put_object('http://www.test.com', 'asdf', 'c', 'o', contents,
+                         chunk_size=20, http_conn=conn)
+            self.assertTrue('Transfer-Encoding: chunked' in sent[0])
+            self.assertEquals(sent[1:], ['14\r\n' + 'a' * 20 + '\r\n',
+                                         '5\r\nbbbbb\r\n', '0\r\n\r\n'])
+
+    def test_chunked_without_memoryview(self):
+        # as on Python 2.6
+        self.patch(c, 'memoryview', None)
+        sent = []
+        conn = c.http_connection('http://www.test.com/')
+        conn[1].getresponse = MockHttpResponse().fake_response
+        conn[1].send = sent.append
+        c.put_object('http://www.test.com', 'asdf', 'c', 'o',
+                     StringIO.StringIO('a' * 20 + 'b' * 5), chunk_size=20,
+                     http_conn=conn)
+        self.assertEquals(sent[1:], ['14\r\n' + 'a' * 20 + '\r\n',
+                                     '5\r\nbbbbb\r\n', '0\r\n\r\n'])
+
+    def test_chunked_long_read(self):
+        sent = []
+
+        class Greedy(object):
+            # returns whatever it has, however much is asked for
+            chunks = ['a' * 30, 'b' * 5, '']
+
+            def read(self, size):
+                return self.chunks.pop(0)
+
+        conn = c.http_connection('http://www.test.com/')
+        conn[1].getresponse = MockHttpResponse().fake_response
+        conn[1].send = lambda data: sent.append(
+            data.tobytes() if isinstance(data, memoryview) else data)
+        c.put_object('http://www.test.com', 'asdf', 'c', 'o', Greedy(),
+                     chunk_size=20, http_conn=conn)
+        self.assertEquals(sent[1:], ['1e\r\n' + 'a' * 30 + '\r\n',
+                                     '5\r\nbbbbb\r\n', '0\r\n\r\n'])
+
+    def test_sendfile(self):
+        sent = []
+
+        def fake_sendfile(out_fd, in_fd, offset, count):
+            os.lseek(in_fd, offset, os.SEEK_SET)
+            data = os.read(in_fd, count)
+            sent.append((offset, len(data)))
+            return os.write(out_fd, data)
+
+        ours, theirs = socket.socketpair()
+        contents = tempfile.TemporaryFile()
+        orig_sendfile = c.sendfile
+        try:
+            contents.write('0123456789' * 10)
+            contents.seek(5)
+            conn = c.http_connection('http://www.test.com/')
+            resp = MockHttpResponse()
+            conn[1].getresponse = resp.fake_response
+            conn[1].connect = lambda: None
+            conn[1].sock = ours
+            c.sendfile = fake_sendfile
+            c.put_object('http://www.test.com', 'asdf', 'c', 'o', contents,
+                         content_length=90, chunk_size=40, http_conn=conn)
+            self.assertEquals(sent, [(5, 40), (45, 40), (85, 10)])
+            self.assertEquals(contents.tell(), 95)
+            theirs.settimeout(1)
+            received = ''
+            while not received.endswith('01234'):
+                received += theirs.recv(4096)
+            self.assertTrue(received.endswith(
+                '\r\n\r\n' + ('0123456789' * 10)[5:95]))
+
+            sent[:] = []
+            conn = c.http_connection('http://www.test.com/')
+            conn[1].getresponse = resp.fake_response
+            conn[1].send = resp.fake_send
+            contents.seek(0)
+            c.put_object('http://www.test.com', 'asdf', 'c', 'o', contents,
+                         content_length=10, http_conn=conn)
+            self.assertEquals(sent, [])
+        finally:
+            c.sendfile = orig_sendfile
+            contents.close()
+            ours.close()
+            theirs.close()
+
+    def test_sendfile_checksum(self):
+        sent = []
+
+        def fake_sendfile(out_fd, in_fd, offset, count):
+            os.lseek(in_fd, offset, os.SEEK_SET)
+            data = os.read(in_fd, count)
+            sent.append((offset, len(data)))
+            return os.write(out_fd, data)
+
+        ours, theirs = socket.socketpair()
+        self.addCleanup(ours.close)
+        self.addCleanup(theirs.close)
+        contents = tempfile.TemporaryFile()
+        self.addCleanup(contents.close)
+        contents.write('0123456789' * 10)
+        self.patch(c, 'sendfile', fake_sendfile)
+        for etag in (md5(('0123456789' * 10)[5:95]).hexdigest(), 'other'):
+            contents.seek(5)
+            sent[:] = []
+            conn = c.http_connection('http://www.test.com/')
+            resp = MockHttpResponse()
+            resp.getheader = lambda name, default=None: {'etag': etag}.get(
+                name, default)
+            conn[1].getresponse = lambda: resp
+            conn[1].connect = lambda: None
+            conn[1].sock = ours
+            try:
+                c.put_object('http://www.test.com', 'asdf', 'c', 'o',
+                             contents, content_length=90, chunk_size=40,
+                             http_conn=conn, checksum=True)
+            except c.ClientException as err:
+                self.assertEquals(etag, 'other')
+                self.assertTrue(err.checksum_mismatch)
+            else:
+                self.assertNotEquals(etag, 'other')
+            # the checksum was taken without giving up sendfile
+            self.assertEquals(sent, [(5, 40), (45, 40), (85, 10)])
+            self.assertEquals(contents.tell(), 95)
+
+    def put_with_etag(self, contents, etag, **kwargs):
+        conn = c.http_connection('http://www.test.com/')
+        resp = MockHttpResponse()
+        resp.getheader = lambda name, default=None: {'etag': etag}.get(
+            name, default)
+        conn[1].getresponse = lambda: resp
+        conn[1].send = resp.fake_send
+        return c.put_object('http://www.test.com', 'asdf', 'c', 'o',
+                            contents, http_conn=conn, checksum=True, **kwargs)
+
+    def test_checksum(self):
+        data = 'a' * 20 + 'b' * 5
+        for content_length in (25, None):
+            self.assertEquals(self.put_with_etag(
+                StringIO.StringIO(data), '"%s"' % md5(data).hexdigest(),
+                content_length=content_length, chunk_size=10),
+                md5(data).hexdigest())
+            exc = self.assertRaises(
+                c.ClientException, self.put_with_etag,
+                StringIO.StringIO(data), md5('other').hexdigest(),
+                content_length=content_length)
+            self.assertEquals(exc.http_status, 422)
+            self.assertTrue(exc.checksum_mismatch)
+
+    def test_checksum_unicode(self):
+        data = u'\u2603 snowman'
+        etag = md5(data.encode('utf8')).hexdigest()
+        self.assertEquals(self.put_with_etag(data, etag), etag)
+
+    def test_checksum_no_sendfile(self):
+        contents = tempfile.TemporaryFile()
+        contents.write('x' * 10)
+        contents.seek(0)
+        self.addCleanup(contents.close)
+        c.sendfile = lambda *args: self.fail('sendfile used')
+        self.put_with_etag(contents, md5('x' * 10).hexdigest(),
+                           content_length=10)
+
 
 class TestPostObject(MockHttpTest):
 
@@ -627,6 +1533,499 @@ class TestDeleteObject(MockHttpTest):
                         query_string="hello=20")
 
 
+class TestBulkDelete(MockHttpTest):
+
+    def _fake(self, status, body):
+        fake = self.fake_http_connection(status, body=body)
+        self.requests = []
+
+        def fake_http_connection(url, proxy=None):
+            parsed, conn = fake(url, proxy)
+            conn.request = lambda *args: self.requests.append(args)
+            return parsed, conn
+        c.http_connection = fake_http_connection
+
+    def test_ok(self):
+        self._fake(200, '\n  {"Number Deleted": 2, "Number Not Found": 1, '
+                        '"Response Status": "400 Bad Request", '
+                        '"Response Body": "", '
+                        '"Errors": [["/c/o%203", "409 Conflict"]]}')
+        result = c.bulk_delete('http://www.test.com/v1/AUTH_a', 'asdf',
+                               ['c/o1', 'c/o2', '/c/o 3', u'c/\u2603'])
+        self.assertEquals(result, {'deleted': 2, 'not_found': 1,
+                                   'errors': [('/c/o 3', '409 Conflict')]})
+        method, path, body, headers = self.requests[0]
+        self.assertEquals((method, path), ('POST',
+                                           '/v1/AUTH_a?bulk-delete'))
+        self.assertEquals(body, '/c/o1\n/c/o2\n/c/o%203\n/c/%E2%98%83')
+        self.assertEquals(headers['Accept'], 'application/json')
+
+    def test_error_paths(self):
+        # failed paths are matched to those given, quoted or not
+        self._fake(200, '{"Number Deleted": 0, "Number Not Found": 0, '
+                        '"Response Status": "400 Bad Request", '
+                        '"Errors": [["/c/%E2%98%83", "409 Conflict"], '
+                        '["/c/100%", "409 Conflict"], '
+                        '["/c/\\u00e9", "409 Conflict"]]}')
+        result = c.bulk_delete('http://www.test.com/v1/AUTH_a', 'asdf',
+                               [u'c/\u2603', 'c/100%', u'c/\u00e9'])
+        self.assertEquals(result['errors'],
+                          [(u'c/\u2603', '409 Conflict'),
+                           ('c/100%', '409 Conflict'),
+                           (u'c/\u00e9', '409 Conflict')])
+
+    def test_not_supported(self):
+        self._fake(204, '')
+        err = self.assertRaises(c.ClientException, c.bulk_delete,
+                                'http://www.test.com/v1/AUTH_a', 'asdf',
+                                ['c/o'])
+        self.assertTrue('not supported' in str(err))
+
+    def test_request_failed(self):
+        self._fake(200, '{"Number Deleted": 0, "Number Not Found": 0, '
+                        '"Response Status": "413 Request Entity Too Large", '
+                        '"Response Body": "Max delete count exceeded", '
+                        '"Errors": []}')
+        err = self.assertRaises(c.ClientException, c.bulk_delete,
+                                'http://www.test.com/v1/AUTH_a', 'asdf',
+                                ['c/o'])
+        self.assertEquals(err.http_status, 413)
+
+    def test_connection_batches(self):
+        batches = []
+
+        def fake_bulk_delete(url, token, paths, http_conn=None):
+            batches.append(paths)
+            return {'deleted': len(paths) - 1, 'not_found': 1,
+                    'errors': [(paths[0], '409 Conflict')]}
+        c.http_connection = self.fake_http_connection(200)
+        c.get_capabilities = lambda *args, **kwargs: {
+            'bulk_delete': {'max_deletes_per_request': 2}}
+        c.bulk_delete = fake_bulk_delete
+        conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                            preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='asdf')
+        result = conn.bulk_delete('c/o%d' % i for i in xrange(5))
+        self.assertEquals(batches, [['c/o0', 'c/o1'], ['c/o2', 'c/o3'],
+                                    ['c/o4']])
+        self.assertEquals(result['deleted'], 2)
+        self.assertEquals(result['not_found'], 3)
+        self.assertEquals(len(result['errors']), 3)
+
+        c.get_capabilities = lambda *args, **kwargs: {}
+        self.assertRaises(c.ClientException, conn.bulk_delete, ['c/o'])
+
+
+class TestIterListing(MockHttpTest):
+
+    def setUp(self):
+        super(TestIterListing, self).setUp()
+        c.http_connection = self.fake_http_connection(200)
+        c.sleep = lambda *args: None
+        self.calls = []
+        self.fail = []
+
+        self.names = ['o%d' % i for i in xrange(5)]
+
+        def fake_get_container(url, token, container, marker=None,
+                               limit=None, prefix=None, end_marker=None,
+                               **kwargs):
+            self.calls.append(marker)
+            if self.fail and self.fail[0] == marker:
+                self.fail.pop(0)
+                raise c.ClientException('Container GET failed',
+                                        http_status=503)
+            names = [n for n in self.names
+                     if n > (marker or '') and n.startswith(prefix or '') and
+                     (not end_marker or n < end_marker)]
+            headers = {'x-container-object-count': str(len(self.names))}
+            return headers, [{'name': n} for n in names[:limit or 3]]
+        c.get_container = fake_get_container
+        self.conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                                 preauthurl='http://www.test.com/v1/AUTH_a',
+                                 preauthtoken='asdf')
+
+    def test_pages(self):
+        for prefetch in (True, False):
+            self.calls = []
+            names = [o['name'] for o in self.conn.iter_container(
+                'c', page_size=2, prefetch=prefetch)]
+            self.assertEquals(names, ['o0', 'o1', 'o2', 'o3', 'o4'])
+            self.assertEquals(self.calls, [None, 'o1', 'o3', 'o4'])
+
+    def test_marker(self):
+        names = [o['name'] for o in self.conn.iter_container(
+            'c', marker='o2', page_size=2)]
+        self.assertEquals(names, ['o3', 'o4'])
+
+    def test_retry_repeats_one_page(self):
+        self.fail = ['o1']
+        names = [o['name'] for o in self.conn.iter_container(
+            'c', page_size=2)]
+        self.assertEquals(names, ['o0', 'o1', 'o2', 'o3', 'o4'])
+        self.assertEquals(self.calls, [None, 'o1', 'o1', 'o3', 'o4'])
+
+    def test_error(self):
+        self.conn.retries = 0
+        self.fail = ['o1']
+        listing = self.conn.iter_container('c', page_size=2)
+        self.assertEquals(listing.next()['name'], 'o0')
+        self.assertEquals(listing.next()['name'], 'o1')
+        err = self.assertRaises(c.ClientException, listing.next)
+        self.assertEquals(err.http_status, 503)
+
+    def test_parallel(self):
+        names = ['a%03d' % i for i in xrange(40)] + \
+            ['b/%d' % i for i in xrange(10)] + \
+            ['2013-05-%02d/x' % i for i in xrange(1, 30)] + \
+            [u'\u2603', '~', 'z', 'zz', 'zzz']
+        self.names = sorted(names)
+        for kwargs in ({}, {'marker': 'a010'}, {'end_marker': 'b/5'},
+                       {'prefix': '2013'}, {'marker': '2013-05-04/x',
+                                            'end_marker': 'a035'}):
+            expected = [o['name'] for o in self.conn.iter_container(
+                'c', page_size=4, **kwargs)]
+            self.calls = []
+            names = [o['name'] for o in self.conn.iter_container(
+                'c', page_size=4, concurrency=4, **kwargs)]
+            self.assertEquals(names, expected)
+            self.assertTrue(len(self.calls) > 1)
+        self.assertEquals(len(expected), 60)
+
+    def test_parallel_one_page(self):
+        names = [o['name'] for o in self.conn.iter_container(
+            'c', page_size=10, concurrency=4)]
+        self.assertEquals(names, self.names)
+        self.assertEquals(self.calls, [''])
+
+    def test_parallel_short_first_page(self):
+        self.names = ['a%06d' % i for i in xrange(5)] + \
+            ['b%06d' % i for i in xrange(200000)]
+        names = [o['name'] for o in self.conn.iter_container(
+            'c', prefix='a', page_size=10, concurrency=8)]
+        self.assertEquals(names, self.names[:5])
+        self.assertEquals(len(self.calls), 1)
+
+    def test_parallel_requests(self):
+        self.names = ['o%04d' % i for i in xrange(205)]
+        names = [o['name'] for o in self.conn.iter_container(
+            'c', page_size=10, concurrency=8)]
+        self.assertEquals(names, self.names)
+        # 21 pages, a short one ending each of the 8 ranges, and at most
+        # two probes per range bound
+        self.assertTrue(len(self.calls) <= 21 + 8 + 14, len(self.calls))
+
+    def test_parallel_server_limit(self):
+        self.names = ['o%02d' % i for i in xrange(20)]
+        c.get_capabilities = lambda *args, **kwargs: {
+            'swift': {'container_listing_limit': 3}}
+        names = [o['name'] for o in self.conn.iter_container(
+            'c', concurrency=4)]
+        self.assertEquals(names, self.names)
+        self.assertEquals(self.conn.listing_limit, 3)
+
+        def no_info(*args, **kwargs):
+            raise c.ClientException('Capabilities GET failed',
+                                    http_status=404)
+        c.get_capabilities = no_info
+        self.conn.listing_limit = None
+        self.calls = []
+        names = [o['name'] for o in self.conn.iter_container(
+            'c', concurrency=4)]
+        self.assertEquals(names, self.names)
+        self.assertEquals(self.conn.listing_limit, 0)
+        # listed a page at a time, up to an empty one
+        self.assertEquals(len(self.calls), 8)
+
+    def test_parallel_stop_early(self):
+        self.names = ['o%03d' % i for i in xrange(300)]
+        listing = self.conn.iter_container('c', page_size=2, concurrency=8)
+        self.assertEquals([o['name'] for o in islice(listing, 5)],
+                          ['o000', 'o001', 'o002', 'o003', 'o004'])
+        listing.close()
+
+    def test_parallel_error(self):
+        self.conn.retries = 0
+        self.names = ['o%03d' % i for i in xrange(30)]
+        self.fail = ['o001']
+        listing = self.conn.iter_container('c', page_size=2, concurrency=3)
+        self.assertEquals([o['name'] for o in islice(listing, 2)],
+                          ['o000', 'o001'])
+        err = self.assertRaises(c.ClientException, list, listing)
+        self.assertEquals(err.http_status, 503)
+
+    def test_clone(self):
+        clone = self.conn.clone()
+        self.assertEquals((clone.url, clone.token),
+                          (self.conn.url, self.conn.token))
+        self.conn.head_account()
+        self.assertTrue(self.conn.http_conn)
+        self.assertEquals(clone.http_conn, None)
+
+
+class TestDownloadObject(MockHttpTest):
+
+    def setUp(self):
+        super(TestDownloadObject, self).setUp()
+        c.http_connection = self.fake_http_connection(200)
+        c.sleep = lambda *args: None
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'out')
+        self.data = ''.join(chr(i % 251) for i in xrange(1000))
+        self.etag = md5(self.data).hexdigest()
+        self.headers = {}
+        self.ranges = []
+        self.segments = dict(('s%d' % i, self.data[i * 250:(i + 1) * 250])
+                             for i in xrange(4))
+        self.hashes = dict((n, md5(d).hexdigest())
+                           for n, d in self.segments.items())
+        self.ignore_if_match = False
+
+        def fake_get_object(url, token, container, name, headers=None,
+                            query_string=None, **kwargs):
+            headers = headers or {}
+            if query_string == 'multipart-manifest=get':
+                self.ranges.append('manifest')
+                return {}, json_dumps([
+                    {'name': '/c_segments/%s' % n, 'bytes': len(d),
+                     'hash': self.hashes[n]}
+                    for n, d in sorted(self.segments.items())])
+            if container == 'c_segments':
+                self.ranges.append(name)
+                data = self.segments[name]
+                if not self.ignore_if_match and headers['If-Match'].strip(
+                        '"') != md5(data).hexdigest():
+                    raise c.ClientException('Object GET failed',
+                                            http_status=412)
+                return {}, iter([data])
+            self.ranges.append(headers.get('Range'))
+            if 'If-Match' in headers and \
+                    headers['If-Match'].strip('"') != self.etag:
+                raise c.ClientException('Object GET failed',
+                                        http_status=412)
+            resp_headers = dict(self.headers, etag=self.etag)
+            if 'Range' not in headers:
+                return resp_headers, iter([self.data])
+            start, end = headers['Range'][6:].split('-')
+            start, end = int(start), min(int(end), len(self.data) - 1)
+            resp_headers['content-range'] = 'bytes %d-%d/%d' % (
+                start, end, len(self.data))
+            return resp_headers, iter([self.data[start:end + 1]])
+        c.get_object = fake_get_object
+
+        def fake_head_object(url, token, container, name, **kwargs):
+            self.ranges.append('HEAD')
+            return dict(self.headers, etag=self.etag,
+                        **{'content-length': str(len(self.data))})
+        c.head_object = fake_head_object
+        self.conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                                 preauthurl='http://www.test.com/v1/AUTH_a',
+                                 preauthtoken='asdf')
+
+    def write(self, data):
+        with open(self.path, 'wb') as fp:
+            fp.write(data)
+
+    def write_etag(self, etag):
+        record = self.path + '.swift-etag'
+        if etag is None:
+            if os.path.exists(record):
+                os.unlink(record)
+            return
+        with open(record, 'w') as fp:
+            fp.write(etag)
+
+    def read(self):
+        with open(self.path, 'rb') as fp:
+            return fp.read()
+
+    def test_ranges(self):
+        headers, length = self.conn.download_object(
+            'c', 'o', self.path, range_size=300, concurrency=3)
+        self.assertEquals(length, 1000)
+        self.assertEquals(headers['content-length'], '1000')
+        self.assertFalse('content-range' in headers)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(sorted(self.ranges),
+                          ['bytes=0-299', 'bytes=300-599', 'bytes=600-899',
+                           'bytes=900-999'])
+
+    def test_small_object(self):
+        for size in (1000, 0):
+            self.data = self.data[:size]
+            self.etag = md5(self.data).hexdigest()
+            self.ranges = []
+            self.assertEquals(self.conn.download_object(
+                'c', 'o', self.path, range_size=1000)[1], size)
+            self.assertEquals(self.read(), self.data)
+            self.assertEquals(self.ranges, ['bytes=0-999'])
+
+    def test_object_changed(self):
+        real_get_object = c.get_object
+
+        def changing_get_object(*args, **kwargs):
+            rv = real_get_object(*args, **kwargs)
+            self.etag = 'new'
+            return rv
+        c.get_object = changing_get_object
+        exc = self.assertRaises(c.ClientException, self.conn.download_object,
+                                'c', 'o', self.path, range_size=300)
+        self.assertEquals(exc.http_status, 412)
+
+    def test_md5_mismatch(self):
+        self.etag = md5('other').hexdigest()
+        self.assertRaises(c.ClientException, self.conn.download_object,
+                          'c', 'o', self.path, range_size=300, concurrency=2)
+
+    def test_manifest(self):
+        self.headers = {'x-static-large-object': 'True'}
+        self.etag = '"not-an-md5"'
+        self.conn.download_object('c', 'o', self.path, range_size=300,
+                                  concurrency=3)
+        self.assertEquals(self.read(), self.data)
+        # the first segment came with the first range
+        self.assertEquals(self.ranges[:2], ['bytes=0-299', 'manifest'])
+        self.assertEquals(sorted(self.ranges[2:]), ['s1', 's2', 's3'])
+
+    def test_manifest_bad_segment(self):
+        self.headers = {'x-static-large-object': 'True'}
+        self.segments['s2'] = 'y' * 250
+        exc = self.assertRaises(c.ClientException, self.conn.download_object,
+                                'c', 'o', self.path, range_size=300)
+        self.assertEquals(exc.http_status, 412)
+        self.assertEquals(self.ranges.count('s2'), 1)
+        # contents not matching the manifest are retried, then refused
+        self.ignore_if_match = True
+        self.ranges = []
+        self.assertRaises(c.ClientException, self.conn.download_object,
+                          'c', 'o', self.path, range_size=300)
+        self.assertEquals(self.ranges.count('s2'), self.conn.retries + 1)
+
+    def test_dlo(self):
+        self.headers = {'x-object-manifest': 'c_segments/s'}
+        self.etag = '"not-an-md5"'
+        listing = [{'name': n, 'bytes': len(d), 'hash': self.hashes[n]}
+                   for n, d in sorted(self.segments.items())]
+
+        def fake_get_container(url, token, container, prefix=None,
+                               marker=None, **kwargs):
+            self.assertEquals((container, prefix), ('c_segments', 's'))
+            return {}, [o for o in listing if o['name'] > (marker or '')]
+        c.get_container = fake_get_container
+        self.conn.download_object('c', 'o', self.path, range_size=300)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(sorted(self.ranges[1:]), ['s1', 's2', 's3'])
+        # a listing not matching the manifest's length is not used
+        listing.pop()
+        self.ranges = []
+        self.conn.download_object('c', 'o', self.path, range_size=300)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(self.ranges, ['bytes=0-299', 'bytes=300-999'])
+
+    def test_resume(self):
+        self.write(self.data[:450])
+        self.write_etag(self.etag)
+        self.assertEquals(self.conn.download_object(
+            'c', 'o', self.path, range_size=300, resume=True)[1], 1000)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(self.ranges, ['HEAD', 'bytes=450-749',
+                                        'bytes=750-999'])
+        self.assertFalse(os.path.exists(self.path + '.swift-etag'))
+        # a complete file is only checked
+        self.ranges = []
+        self.conn.download_object('c', 'o', self.path, resume=True)
+        self.assertEquals(self.ranges, ['HEAD'])
+
+    def test_etag_kept_until_complete(self):
+        self.etag = md5('other').hexdigest()
+        self.assertRaises(c.ClientException, self.conn.download_object,
+                          'c', 'o', self.path, range_size=300)
+        with open(self.path + '.swift-etag') as fp:
+            self.assertEquals(fp.read(), self.etag)
+
+    def test_resume_other_contents(self):
+        # without a matching ETag the partial file is not read back at all
+        for partial, etag in (('x' * 450, None), ('x' * 450, 'old'),
+                              ('x' * 1001, self.etag)):
+            self.write(partial)
+            self.write_etag(etag)
+            self.ranges = []
+            self.conn.download_object('c', 'o', self.path, range_size=600,
+                                      resume=True)
+            self.assertEquals(self.read(), self.data)
+            self.assertEquals(self.ranges, ['HEAD', 'bytes=0-599',
+                                            'bytes=600-999'])
+        # contents not matching the object are downloaded again
+        self.write('x' * 450)
+        self.write_etag(self.etag)
+        self.ranges = []
+        self.conn.download_object('c', 'o', self.path, range_size=600,
+                                  resume=True)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(self.ranges, ['HEAD', 'bytes=450-999',
+                                        'bytes=0-599', 'bytes=600-999'])
+
+    def test_resume_full_size(self):
+        # a copy of the right length is checked before being kept
+        self.write('x' * 1000)
+        self.conn.download_object('c', 'o', self.path, range_size=600,
+                                  resume=True)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(self.ranges, ['HEAD', 'bytes=0-599',
+                                        'bytes=600-999'])
+        self.ranges = []
+        self.conn.download_object('c', 'o', self.path, resume=True)
+        self.assertEquals(self.ranges, ['HEAD'])
+
+    def test_resume_full_size_dlo(self):
+        self.headers = {'x-object-manifest': 'c_segments/s'}
+        self.etag = '"not-an-md5"'
+        listing = [{'name': n, 'bytes': len(d), 'hash': self.hashes[n]}
+                   for n, d in sorted(self.segments.items())]
+
+        def fake_get_container(url, token, container, prefix=None,
+                               marker=None, **kwargs):
+            return {}, [o for o in listing if o['name'] > (marker or '')]
+        c.get_container = fake_get_container
+        self.write(self.data[:250] + 'x' * 750)
+        self.conn.download_object('c', 'o', self.path, resume=True)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(sorted(self.ranges[1:]), ['s1', 's2', 's3'])
+        # without segments to check it against the file is not kept
+        listing.pop()
+        self.write('x' * 1000)
+        self.ranges = []
+        self.conn.download_object('c', 'o', self.path, resume=True)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(self.ranges, ['HEAD', 'bytes=0-67108863'])
+
+    def test_resume_manifest(self):
+        self.headers = {'x-static-large-object': 'True'}
+        self.etag = '"not-an-md5"'
+        self.write(self.data[:400])
+        self.write_etag('not-an-md5')
+        self.conn.download_object('c', 'o', self.path, resume=True)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(self.ranges[:2], ['HEAD', 'manifest'])
+        self.assertEquals(sorted(self.ranges[2:]), ['s1', 's2', 's3'])
+        # segments found not to match are fetched again
+        self.write(self.data[:100] + 'x' * 300)
+        self.write_etag('not-an-md5')
+        self.ranges = []
+        self.conn.download_object('c', 'o', self.path, resume=True)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(sorted(self.ranges[2:]), ['s0', 's1', 's2', 's3'])
+        # a partial copy of another version of the manifest is not used
+        self.write('x' * 400)
+        self.write_etag('older')
+        self.ranges = []
+        self.conn.download_object('c', 'o', self.path, resume=True)
+        self.assertEquals(self.read(), self.data)
+        self.assertEquals(self.ranges, ['HEAD', 'bytes=0-67108863',
+                                        'manifest'])
+
+
 class TestConnection(MockHttpTest):
 
     def test_instance(self):
@@ -657,6 +2056,43 @@ class TestConnection(MockHttpTest):
         self.assertRaises(c.ClientException, conn.head_account)
         self.assertEquals(conn.attempts, conn.retries + 1)
 
+    def test_retry_checksum_mismatch(self):
+        c.http_connection = self.fake_http_connection(201)
+        c.sleep = lambda *args: None
+        etags = [md5('other').hexdigest(), md5('data').hexdigest()]
+        positions = []
+
+        def fake_put_object(url, token, container, name, contents,
+                            checksum=False, **kwargs):
+            self.assertTrue(checksum)
+            positions.append(contents.tell())
+            data = contents.read()
+            etag = etags.pop(0)
+            if etag != md5(data).hexdigest():
+                err = c.ClientException('Object PUT failed', http_status=422)
+                err.checksum_mismatch = True
+                raise err
+            return etag
+        c.put_object = fake_put_object
+        conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                            preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='asdf')
+        self.assertEquals(conn.put_object('c', 'o', StringIO.StringIO('data'),
+                                          checksum=True),
+                          md5('data').hexdigest())
+        self.assertEquals(positions, [0, 0])
+
+    def test_no_retry_wrong_etag(self):
+        c.http_connection = self.fake_http_connection(422)
+        c.sleep = lambda *args: self.fail('retried')
+        conn = c.Connection('http://www.test.com', 'asdf', 'asdf',
+                            preauthurl='http://www.test.com/v1/AUTH_a',
+                            preauthtoken='asdf')
+        exc = self.assertRaises(c.ClientException, conn.put_object, 'c', 'o',
+                                'data', etag=md5('other').hexdigest())
+        self.assertEquals(exc.http_status, 422)
+        self.assertEquals(conn.attempts, 1)
+
     def test_resp_read_on_server_error(self):
         c.http_connection = self.fake_http_connection(500)
         conn = c.Connection('http://www.test.com', 'asdf', 'asdf', retries=0)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# Copyright (c) 2013 OpenStack, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measure what HTTPS connection setup costs swiftclient.
+
+Starts a local TLS stub server and times HEAD requests against it made
+with a new SSL context per connection (what httplib does by default), with
+the per-endpoint context shared by swiftclient.client.http_connection(),
+and with keep-alive connections from a ConnectionPool.
+
+A self-signed certificate is generated with the openssl command line tool
+unless --cert and --key are given.
+"""
+
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from httplib import HTTPSConnection
+from optparse import OptionParser
+from os.path import join
+from threading import Thread
+from time import time
+
+from swiftclient import client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # buffer the response so it goes out in one write; together with
+    # TCP_NODELAY this keeps Nagle and delayed ACKs out of the numbers
+    wbufsize = -1
+
+    def do_HEAD(self):
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(HTTPServer):
+
+    def __init__(self, cert, key):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        self.context.load_cert_chain(cert, key)
+
+    def get_request(self):
+        sock, addr = HTTPServer.get_request(self)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self.context.wrap_socket(sock, server_side=True), addr
+
+    def process_request(self, request, client_address):
+        # one thread per connection so keep-alive clients do not block
+        thread = Thread(target=self._serve, args=(request, client_address))
+        thread.daemon = True
+        thread.start()
+
+    def _serve(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except (socket.error, ssl.SSLError):
+            pass
+        finally:
+            self.shutdown_request(request)
+
+
+def make_cert(tmpdir):
+    cert = join(tmpdir, 'cert.pem')
+    key = join(tmpdir, 'key.pem')
+    subprocess.check_call(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-days', '1', '-subj', '/CN=127.0.0.1', '-keyout', key,
+         '-out', cert], stdout=open('/dev/null', 'w'),
+        stderr=subprocess.STDOUT)
+    return cert, key
+
+
+def head(conn, close):
+    conn.request('HEAD', '/', headers={})
+    conn.getresponse().read()
+    if close:
+        conn.close()
+
+
+def bench_default(url, netloc, cacert, requests):
+    for _junk in xrange(requests):
+        context = ssl.create_default_context(cafile=cacert)
+        head(HTTPSConnection(netloc, context=context), True)
+
+
+def bench_shared_context(url, netloc, cacert, requests):
+    for _junk in xrange(requests):
+        head(client.http_connection(url, cacert=cacert)[1], True)
+
+
+def bench_pooled(url, netloc, cacert, requests):
+    pool = client.ConnectionPool()
+    for _junk in xrange(requests):
+        http_conn = pool.get(url, cacert=cacert)
+        head(http_conn[1], False)
+        pool.put(http_conn)
+    pool.close()
+
+
+def main():
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-n', '--requests', type=int, default=200,
+                      help='Number of requests per mode (default 200)')
+    parser.add_option('--cert', help='Server certificate (PEM)')
+    parser.add_option('--key', help='Server private key (PEM)')
+    options, _junk = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        if options.cert and options.key:
+            cert, key = options.cert, options.key
+        else:
+            cert, key = make_cert(tmpdir)
+        server = StubServer(cert, key)
+        thread = Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        netloc = '127.0.0.1:%d' % server.server_address[1]
+        url = 'https://%s/' % netloc
+
+        baseline = None
+        for name, func in (('new context per connection', bench_default),
+                           ('shared per-endpoint context',
+                            bench_shared_context),
+                           ('pooled keep-alive connections', bench_pooled)):
+            start = time()
+            func(url, netloc, cert, options.requests)
+            elapsed = time() - start
+            if baseline is None:
+                baseline = elapsed
+            print '%-32s %7.3fs  %6.2fms/request  %5.1f%% of baseline' % (
+                name, elapsed, elapsed * 1000 / options.requests,
+                elapsed * 100 / baseline)
+        server.shutdown()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()